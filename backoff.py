@@ -0,0 +1,80 @@
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+import constants
+
+
+def parse_retry_after(value, now=None):
+    """Значение заголовка Retry-After в секундах.
+    Заголовок бывает числом секунд или HTTP-датой.
+    """
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, date.timestamp() - now)
+
+
+class PollPolicy:
+    """Политика интервалов между опросами подписки.
+    Успешный опрос повторяется через interval с разбросом jitter,
+    после сбоев задержка растёт экспоненциально от backoff_base
+    до backoff_max. Retry-After от API всегда соблюдается.
+    Интервал умножается на коэффициент по статусам работ подписки:
+    работы на проверке опрашиваются чаще принятых.
+    """
+
+    def __init__(self, interval, backoff_base=constants.BACKOFF_BASE,
+                 backoff_max=constants.BACKOFF_MAX,
+                 jitter=constants.POLL_JITTER,
+                 factors=constants.STATUS_INTERVAL_FACTORS, rng=None):
+        self.interval = interval
+        self.factors = factors
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.rng = rng or random.Random()
+
+    def initial_delay(self):
+        """Случайный сдвиг первого опроса в пределах интервала."""
+        return self.rng.uniform(0, self.interval)
+
+    def interval_factor(self, statuses):
+        """Коэффициент интервала: самый частый из статусов работ."""
+        return min(
+            (self.factors.get(status, 1.0) for status in statuses),
+            default=1.0,
+        )
+
+    def next_delay(self, failures=0, retry_after=None, statuses=()):
+        """Задержка до следующего опроса после failures сбоев подряд."""
+        if failures:
+            # «Equal jitter»: половина задержки фиксирована,
+            # вторая половина случайна.
+            # Показатель ограничен: 2 ** n при больших n не умещается
+            # во float, а задержка всё равно упирается в backoff_max.
+            delay = min(
+                self.backoff_max,
+                self.backoff_base * 2 ** min(failures - 1, 32),
+            )
+            delay = delay / 2 + self.rng.uniform(0, delay / 2)
+        else:
+            delay = self.interval * self.interval_factor(statuses)
+            delay *= self.rng.uniform(
+                1 - self.jitter, 1 + self.jitter
+            )
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def spread(self):
+        """Небольшой случайный сдвиг, чтобы подписки не стартовали разом."""
+        return self.rng.uniform(0, self.backoff_base)
@@ -0,0 +1,47 @@
+"""Задержка одного опроса: requests.get против общей сессии.
+
+Запуск: python -m benchmarks.bench_http_session [число_запросов]
+Заглушка работает по HTTP, поэтому в выигрыш входит только TCP-рукопожатие;
+на реальном HTTPS-эндпоинте к нему добавляется TLS.
+"""
+import logging
+import statistics
+import sys
+import time
+
+import homework
+import http_client
+from benchmarks.stubs import PracticumStubHandler, StubServer, make_homeworks
+
+
+def measure(polls, session):
+    timings = []
+    timestamp = int(time.time())
+    for _ in range(polls):
+        started = time.perf_counter()
+        homework.request_api_answer('token', timestamp, session)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    p50 = statistics.median(timings) * 1000
+    p99 = timings[int(len(timings) * 0.99) - 1] * 1000
+    print(f'{name:<16} p50={p50:.3f} мс  p99={p99:.3f} мс')
+
+
+def main():
+    polls = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    logging.disable(logging.CRITICAL)
+    with StubServer(PracticumStubHandler, homeworks=make_homeworks(3)) as stub:
+        homework.ENDPOINT = f'{stub.url}/api/user_api/homework_statuses/'
+        import requests
+        report('requests.get', measure(polls, requests))
+        session = http_client.create_session()
+        report('Session', measure(polls, session))
+        session.close()
+
+
+if __name__ == '__main__':
+    main()
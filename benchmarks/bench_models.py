@@ -0,0 +1,61 @@
+"""Память на одну отслеживаемую работу: словарь против Homework.
+
+Запуск: python -m benchmarks.bench_models [число_работ]
+Записи строятся из отдельно разобранных JSON-ответов, как в опросе:
+у каждого словаря свои строки статуса и ключей. Отдельно замеряется
+StatusIndex, который держит в памяти весь процесс: только ключ работы
+и интернированный статус, по PER_TENANT работ на подписку.
+"""
+import json
+import sys
+import tracemalloc
+
+from benchmarks.stubs import make_homeworks
+from models import Homework
+from status_index import StatusIndex
+
+PER_TENANT = 10
+
+
+def build(count, convert):
+    # Каждый ответ разбирается отдельно, как при реальном опросе.
+    raw = [json.dumps(homework) for homework in make_homeworks(count)]
+    tracemalloc.start()
+    records = [convert(json.loads(item)) for item in raw]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return records, size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    for name, convert in [
+        ('dict (весь ответ)', lambda data: data),
+        ('dict (4 поля)', lambda data: {
+            key: data[key]
+            for key in ('id', 'homework_name', 'status', 'date_updated')
+        }),
+        ('Homework', Homework.from_dict),
+    ]:
+        records, size = build(count, convert)
+        print(f'{name:<18} {size / count:8.1f} байт на работу')
+        del records
+    size = index_size(count)
+    print(f'{"StatusIndex":<18} {size / count:8.1f} байт на работу, '
+          f'{size / (count // PER_TENANT):8.1f} байт на подписку')
+
+
+def index_size(count):
+    records, _ = build(count, Homework.from_dict)
+    index = StatusIndex()
+    tracemalloc.start()
+    for number, homework in enumerate(records):
+        index.update(f'tenant_{number // PER_TENANT}', homework,
+                     persist=False)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Стоимость перепланирования подписки в DeadlineScheduler.
+
+Запуск: python -m benchmarks.bench_scheduler
+Для каждого размера очереди замеряется цикл «извлечь ближайшую
+подписку и назначить ей новый срок». При O(log n) время операции
+растёт медленно, а не пропорционально числу подписок.
+"""
+import random
+import time
+
+from scheduler import DeadlineScheduler
+
+
+def bench(tenants, operations=200_000):
+    rng = random.Random(0)
+    scheduler = DeadlineScheduler()
+    for key in range(tenants):
+        scheduler.schedule(key, rng.uniform(0, 600))
+    now = 0.0
+    started = time.perf_counter()
+    for _ in range(operations):
+        now = scheduler.next_due()
+        for key in scheduler.pop_due(now):
+            scheduler.schedule(key, now + rng.uniform(300, 1200))
+    pop_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(operations):
+        # Перенос срока подписки, которая ещё стоит в очереди.
+        scheduler.schedule(rng.randrange(tenants), now + rng.uniform(0, 600))
+    move_elapsed = time.perf_counter() - started
+    return pop_elapsed / operations, move_elapsed / operations
+
+
+def main():
+    for tenants in (1_000, 10_000, 100_000):
+        pop, move = bench(tenants)
+        print(
+            f'подписок={tenants:>7}  '
+            f'извлечь+назначить={pop * 1e6:.2f} мкс  '
+            f'перенести={move * 1e6:.2f} мкс'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""Время холодного старта: импорт homework и путь до первого опроса.
+
+Запуск: python -m benchmarks.bench_startup --runs 5
+Импорт замеряется через python -X importtime, старт — от запуска
+процесса homework.py до первого запроса к заглушке API Практикума.
+Результат сохраняется через --output и сравнивается с --compare,
+как в benchmarks.e2e.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.e2e import compare, git_revision
+from benchmarks.stubs import (BotApiStubHandler, PracticumStubHandler,
+                              StubServer, make_homeworks)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HIGHER_IS_BETTER = {
+    'import_ms': False,
+    'first_poll_ms': False,
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--commands', action='store_true',
+                        help='с командами бота (BOT_COMMANDS=1)')
+    parser.add_argument('--top', type=int, default=10,
+                        help='сколько самых долгих импортов показать')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--output', help='куда сохранить результат (JSON)')
+    parser.add_argument('--compare', help='файл предыдущего результата')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    return parser.parse_args(argv)
+
+
+def parse_importtime(stderr):
+    """Строки -X importtime: [(уровень, модуль, собственное, общее)], мкс."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, total, name = line[len('import time:'):].split('|')
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((level, name.strip(), int(own), int(total)))
+    return rows
+
+
+def measure_import():
+    """Общее время импорта homework и его прямые зависимости."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import homework'],
+        capture_output=True, text=True, cwd=ROOT, check=True,
+    )
+    rows = parse_importtime(result.stderr)
+    total = next(row[3] for row in rows if row[1] == 'homework')
+    # В выводе -X importtime модуль идёт после своих зависимостей.
+    children = []
+    collecting = False
+    for level, name, _, cumulative in reversed(rows):
+        if level == 0:
+            collecting = name == 'homework'
+        elif level == 1 and collecting:
+            children.append((name, cumulative))
+    return total, children
+
+
+def measure_first_poll(environ, server, timeout):
+    """Время от запуска процесса бота до первого запроса к API."""
+    server.first_request = None
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, 'homework.py'], cwd=ROOT, env=environ,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = started + timeout
+        while server.first_request is None:
+            if process.poll() is not None:
+                raise RuntimeError(
+                    f'Бот завершился с кодом {process.returncode}'
+                )
+            if time.perf_counter() > deadline:
+                raise TimeoutError('Бот не сделал ни одного запроса')
+            time.sleep(0.001)
+        return server.first_request - started
+    finally:
+        process.kill()
+        process.wait()
+
+
+def run(args):
+    imports = [measure_import() for _ in range(args.runs)]
+    children = {}
+    for _, modules in imports:
+        for name, cumulative in modules:
+            children.setdefault(name, []).append(cumulative)
+
+    practicum = StubServer(PracticumStubHandler, homeworks=make_homeworks(1))
+    bot_api = StubServer(BotApiStubHandler)
+    with practicum, bot_api, tempfile.TemporaryDirectory() as directory:
+        environ = dict(
+            os.environ,
+            PRACTICUM_TOKEN='benchmark',
+            TELEGRAM_TOKEN='123:benchmark',
+            TELEGRAM_CHAT_ID='1',
+            PRACTICUM_ENDPOINT=(
+                f'{practicum.url}/api/user_api/homework_statuses/'
+            ),
+            TELEGRAM_API_URL=f'{bot_api.url}/bot',
+            BOT_COMMANDS='1' if args.commands else '0',
+            # Без разброса первого опроса по интервалу.
+            RETRY_TIME='0',
+            STORAGE_PATH=os.path.join(directory, 'bench.sqlite3'),
+            # Перезапуск реплики с тем же именем сразу возвращает аренду.
+            REPLICA_ID='benchmark',
+        )
+        first_polls = [
+            measure_first_poll(environ, practicum, args.timeout)
+            for _ in range(args.runs)
+        ]
+
+    slowest = sorted(
+        ((statistics.median(values), name)
+         for name, values in children.items()),
+        reverse=True,
+    )[:args.top]
+    for cumulative, name in slowest:
+        print(f'  {name:<24} {cumulative / 1000:8.1f} мс')
+    return {
+        'import_ms': statistics.median(total for total, _ in imports) / 1000,
+        'first_poll_ms': statistics.median(first_polls) * 1000,
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run(args)
+    report = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'timestamp': int(time.time()),
+        'params': {'runs': args.runs, 'commands': args.commands},
+        'results': results,
+    }
+    for name, value in results.items():
+        print(f'{name:<22} {value:>10.2f}')
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)
+        if compare(results, baseline['results'], args.tolerance,
+                   HIGHER_IS_BETTER):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
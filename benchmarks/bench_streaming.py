@@ -0,0 +1,54 @@
+"""Пиковая память разбора ответа: json.loads против HomeworkStream.
+
+Запуск: python -m benchmarks.bench_streaming
+Тело ответа подаётся частями по 64 КБ, как из сети. Для честности
+оно генерируется на лету и не хранится целиком.
+"""
+import json
+import tracemalloc
+
+import constants
+from benchmarks.stubs import make_homeworks
+from streaming import HomeworkStream
+
+
+def body_chunks(count):
+    """Тело ответа homework_statuses частями по STREAM_CHUNK_SIZE."""
+    homework = make_homeworks(1)[0]
+    buffer = '{"homeworks": ['
+    for number in range(count):
+        item = json.dumps(dict(homework, id=number))
+        buffer += item if number == 0 else ', ' + item
+        if len(buffer) >= constants.STREAM_CHUNK_SIZE:
+            yield buffer.encode()
+            buffer = ''
+    yield (buffer + '], "current_date": 1700000000}').encode()
+
+
+def peak(function):
+    tracemalloc.start()
+    function()
+    _, peak_size = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak_size / 1024 / 1024
+
+
+def parse_whole(count):
+    data = json.loads(b''.join(body_chunks(count)))
+    return sum(1 for _ in data['homeworks'])
+
+
+def parse_stream(count):
+    return sum(1 for _ in HomeworkStream(body_chunks(count)))
+
+
+def main():
+    for count in (1_000, 10_000, 100_000):
+        whole = peak(lambda: parse_whole(count))
+        stream = peak(lambda: parse_stream(count))
+        print(f'работ={count:>7}  json.loads={whole:8.2f} МБ  '
+              f'HomeworkStream={stream:6.2f} МБ')
+
+
+if __name__ == '__main__':
+    main()
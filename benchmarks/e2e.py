@@ -0,0 +1,241 @@
+"""Сквозной бенчмарк бота на локальных заглушках Практикума и Bot API.
+
+Запуск: python -m benchmarks.e2e --tenants 1000 --duration 30
+Результат сохраняется в JSON (--output); с --compare файл сравнивается
+с предыдущим, и при ухудшении больше --tolerance код выхода равен 1.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import homework
+import http_client
+from hashring import HashRing
+from journal import JournalWriter
+from benchmarks.stubs import (BotApiStubHandler, PracticumStubHandler,
+                              StubProcess, make_homeworks)
+from storage import Storage
+from tenants import Tenant
+
+# Для каждого показателя: больше — лучше (True) или меньше — лучше (False).
+HIGHER_IS_BETTER = {
+    'polls_per_second': True,
+    'messages_per_second': True,
+    'poll_p50_ms': False,
+    'poll_p99_ms': False,
+    'send_p50_ms': False,
+    'send_p99_ms': False,
+    'max_rss_mb': False,
+}
+
+
+class Recorder:
+    """Длительности вызовов, собранные из потоков пула."""
+
+    def __init__(self, func):
+        self.func = func
+        self.timings = []
+        self._lock = threading.Lock()
+
+    def __call__(self, *args):
+        started = time.perf_counter()
+        try:
+            return self.func(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.timings.append(elapsed)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=20,
+                        help='длительность замера, с')
+    parser.add_argument('--interval', type=float, default=5,
+                        help='интервал опроса подписки, с')
+    parser.add_argument('--homeworks', type=int, default=1,
+                        help='работ в одном ответе API')
+    parser.add_argument('--change-every', type=int, default=3,
+                        help='статус меняется каждые N запросов (0 — никогда)')
+    parser.add_argument('--api-latency', type=float, default=0.0)
+    parser.add_argument('--bot-latency', type=float, default=0.0)
+    parser.add_argument('--telegram-rate', type=float, default=1000,
+                        help='общий лимит отправки, сообщений/с')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='процессов-шардов, как WORKER_PROCESSES')
+    parser.add_argument('--journal',
+                        help='записать обмены с API в журнал (JOURNAL_PATH)')
+    parser.add_argument('--output', help='куда сохранить результат (JSON)')
+    parser.add_argument('--compare', help='файл предыдущего результата')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='допустимое ухудшение, доля')
+    return parser.parse_args(argv)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def drive(engine, duration):
+    try:
+        await asyncio.wait_for(engine.run(), duration)
+    except asyncio.TimeoutError:
+        pass
+
+
+def run_shard(args, shard, practicum_url, bot_api_url, storage_path):
+    """Прогон движка с подписками одного шарда.
+    Возвращает длительности запросов и отправок, время прогона
+    и пиковый RSS процесса.
+    """
+    logging.disable(logging.CRITICAL)
+    homework.ENDPOINT = f'{practicum_url}/api/user_api/homework_statuses/'
+    homework.TELEGRAM_API_URL = f'{bot_api_url}/bot'
+    homework.TELEGRAM_TOKEN = '123:benchmark'
+    homework.RETRY_TIME = args.interval
+    homework.TELEGRAM_GLOBAL_RATE = args.telegram_rate
+    bot = homework.get_bot()
+    session = http_client.create_session(homework.HTTP_POOL_SIZE)
+    storage = Storage(storage_path)
+    ring = HashRing(args.workers)
+    tenants = [
+        Tenant(f'token-{number}', number)
+        for number in range(args.tenants)
+    ]
+    tenants = [tenant for tenant in tenants if ring.owns(shard, tenant.id)]
+    engine = homework.create_engine(
+        tenants, bot, session, storage, shards=args.workers
+    )
+    fetch = engine.fetch = Recorder(engine.fetch)
+    send = engine.delivery.send = Recorder(engine.delivery.send)
+    if args.journal:
+        homework.JOURNAL = JournalWriter(
+            args.journal if args.workers == 1 else f'{args.journal}.{shard}'
+        )
+    started = time.perf_counter()
+    asyncio.run(drive(engine, args.duration))
+    elapsed = time.perf_counter() - started
+    session.close()
+    storage.close()
+    if homework.JOURNAL is not None:
+        homework.JOURNAL.close()
+    # На Linux ru_maxrss измеряется в килобайтах.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return fetch.timings, send.timings, elapsed, rss
+
+
+def run(args):
+    logging.disable(logging.CRITICAL)
+    practicum = StubProcess(
+        PracticumStubHandler,
+        latency=args.api_latency,
+        homeworks=make_homeworks(args.homeworks),
+        change_every=args.change_every,
+    )
+    bot_api = StubProcess(BotApiStubHandler, latency=args.bot_latency)
+    with practicum, bot_api, tempfile.TemporaryDirectory() as directory:
+        shards = [
+            (args, shard, practicum.url, bot_api.url,
+             os.path.join(directory, 'bench.sqlite3'))
+            for shard in range(args.workers)
+        ]
+        if args.workers == 1:
+            results = [run_shard(*shards[0])]
+        else:
+            context = multiprocessing.get_context('spawn')
+            with context.Pool(args.workers) as pool:
+                results = pool.starmap(run_shard, shards)
+
+    fetches = [timing for result in results for timing in result[0]]
+    sends = [timing for result in results for timing in result[1]]
+    # Скорость считается по времени прогона каждого шарда, без учёта
+    # запуска процессов.
+    return {
+        'polls_per_second': sum(
+            len(result[0]) / result[2] for result in results
+        ),
+        'messages_per_second': sum(
+            len(result[1]) / result[2] for result in results
+        ),
+        'poll_p50_ms': statistics.median(fetches or [0]) * 1000,
+        'poll_p99_ms': percentile(fetches, 0.99) * 1000,
+        'send_p50_ms': statistics.median(sends or [0]) * 1000,
+        'send_p99_ms': percentile(sends, 0.99) * 1000,
+        # Суммарная память всех шардов.
+        'max_rss_mb': sum(result[3] for result in results),
+    }
+
+
+def compare(results, baseline, tolerance, directions=HIGHER_IS_BETTER):
+    """Печатает разницу с baseline; возвращает список ухудшений."""
+    regressions = []
+    for name, higher_is_better in directions.items():
+        old = baseline.get(name)
+        new = results[name]
+        if not old:
+            continue
+        change = (new - old) / old
+        worse = -change if higher_is_better else change
+        mark = ''
+        if worse > tolerance:
+            mark = '  <-- ухудшение'
+            regressions.append(name)
+        print(f'{name:<22} {old:>10.2f} -> {new:>10.2f} '
+              f'({change:+.1%}){mark}')
+    return regressions
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run(args)
+    report = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'timestamp': int(time.time()),
+        'params': {
+            key: value for key, value in vars(args).items()
+            if key not in ('output', 'compare', 'tolerance', 'journal')
+        },
+        'results': results,
+    }
+    for name, value in results.items():
+        print(f'{name:<22} {value:>10.2f}')
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)
+        if baseline.get('params') != report['params']:
+            print('Внимание: параметры запуска отличаются от сравниваемых')
+        if compare(results, baseline['results'], args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Воспроизведение журнала обменов с API (JOURNAL_PATH).
+
+Запуск: python -m benchmarks.replay journal.bin [--speed 10] [--repeat 3]
+Записанные ответы Практикума прогоняются через check_response,
+сравнение со статусами и parse_status так же, как при опросе.
+Без --speed — с максимальной скоростью, с --speed сохраняются
+интервалы между запросами, ускоренные в указанное число раз.
+"""
+import argparse
+import logging
+import time
+
+import constants
+import homework
+import streaming
+from journal import API, Journal, replay
+from status_index import StatusIndex
+
+
+class Replayer:
+    """Обработка записей API и счётчики для отчёта."""
+
+    def __init__(self):
+        self.index = StatusIndex()
+        self.records = 0
+        self.bytes = 0
+        self.homeworks = 0
+        self.changed = 0
+        self.errors = 0
+
+    def __call__(self, record):
+        self.records += 1
+        self.bytes += len(record.body)
+        if record.meta['status'] != 200:
+            self.errors += 1
+            return
+        try:
+            homeworks = list(homework.check_api_response(
+                parse_body(record.body)
+            ))
+            changed = self.index.diff(record.meta['tenant'], homeworks)
+            for item in changed:
+                homework.parse_status(item)
+                self.index.update(record.meta['tenant'], item)
+        except Exception:
+            self.errors += 1
+            return
+        self.homeworks += len(homeworks)
+        self.changed += len(changed)
+
+
+def parse_body(body):
+    """Тело ответа тем же путём, что и в request_api_stream."""
+    if len(body) <= constants.STREAM_THRESHOLD:
+        return streaming.loads(bytes(body))
+    size = constants.STREAM_CHUNK_SIZE
+    return streaming.HomeworkStream(
+        bytes(body[start:start + size])
+        for start in range(0, len(body), size)
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('journal')
+    parser.add_argument('--speed', type=float,
+                        help='ускорение времени; без него — без пауз')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='проходов по журналу (индекс каждый раз пуст)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.disable(logging.CRITICAL)
+    with Journal(args.journal) as journal:
+        for _ in range(args.repeat):
+            replayer = Replayer()
+            started = time.perf_counter()
+            replay(journal, replayer, args.speed, kinds=(API,))
+            elapsed = time.perf_counter() - started
+            print(
+                f'записей {replayer.records}, '
+                f'{replayer.bytes / 2 ** 20:.1f} МБ, '
+                f'работ {replayer.homeworks}, '
+                f'изменений {replayer.changed}, ошибок {replayer.errors}; '
+                f'{elapsed:.2f} с, {replayer.records / elapsed:.0f} '
+                f'записей/с, {replayer.bytes / 2 ** 20 / elapsed:.1f} МБ/с'
+            )
+
+
+if __name__ == '__main__':
+    main()
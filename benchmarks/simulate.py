@@ -0,0 +1,298 @@
+"""Симуляция опроса в виртуальном времени.
+
+Запуск: python -m benchmarks.simulate --tenants 5000 --days 14
+Движок работает на VirtualClock: паузы между опросами не ждутся,
+время сразу переводится к ближайшему сроку, и недели опроса
+проходят за секунды. API Практикума заменено моделью в памяти,
+с --http — той же моделью за локальным HTTP-сервером. Статус работы
+каждой подписки меняется в случайные моменты; --outage-at
+и --outage-hours добавляют недоступность API (ответ 503).
+Выводятся число запросов к API, запросов на подписку в сутки,
+задержка уведомления от смены статуса до отправки и пик запросов
+за секунду — всё в виртуальном времени.
+"""
+import argparse
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+import homework
+import http_client
+from backoff import PollPolicy
+from benchmarks.e2e import compare, git_revision, percentile
+from benchmarks.stubs import StubServer
+from circuit_breaker import CircuitBreaker
+from clock import VirtualClock
+from delivery import DeliveryQueue
+from engine import PollingEngine
+from error_notifier import ErrorNotifier
+from exceptions import APIResponseStatusCodeException
+from tenants import Tenant
+
+HIGHER_IS_BETTER = {
+    'api_calls_per_tenant_day': False,
+    'peak_calls_per_second': False,
+    'notify_p50_s': False,
+    'notify_p99_s': False,
+    'missed_statuses': False,
+}
+
+VERDICTS = ('rejected', 'approved')
+
+
+class HomeworkState:
+    """Работа подписки в модели: статус и время его смены."""
+
+    __slots__ = ('status', 'updated', 'next_change', 'reported', 'pending')
+
+    def __init__(self, next_change):
+        self.status = 'reviewing'
+        # Статус до начала симуляции уже известен подписчику.
+        self.updated = -1.0
+        self.next_change = next_change
+        self.reported = 'reviewing'
+        self.pending = None
+
+
+class SimulatedApi:
+    """Эндпоинт homework_statuses в виртуальном времени.
+    У каждой подписки одна работа: она уходит на проверку, получает
+    вердикт, снова уходит на проверку и т. д. Промежутки между сменами
+    статуса случайные, в среднем mean_change секунд. Ответ содержит
+    работу, если она менялась после from_date, как у настоящего API.
+    """
+
+    def __init__(self, clock, tenants, mean_change, outage=None, seed=0):
+        self.clock = clock
+        self.mean_change = mean_change
+        self.outage = outage
+        self.rng = random.Random(seed)
+        self.homeworks = {
+            tenant.token: HomeworkState(self._interval())
+            for tenant in tenants
+        }
+        self.calls = 0
+        self.per_second = Counter()
+        self.latencies = []
+        self.missed = 0
+
+    def _interval(self):
+        return self.rng.expovariate(1 / self.mean_change)
+
+    def _advance(self, state, now):
+        while state.next_change <= now:
+            if state.status == 'reviewing':
+                state.status = self.rng.choice(VERDICTS)
+            else:
+                state.status = 'reviewing'
+            state.updated = state.next_change
+            if state.pending is None:
+                state.pending = state.next_change
+            state.next_change += self._interval()
+
+    def fetch(self, token, from_date):
+        """Ответ API для подписки на текущий момент виртуального времени."""
+        now = self.clock.monotonic()
+        self.calls += 1
+        self.per_second[int(now)] += 1
+        if self.outage and self.outage[0] <= now < self.outage[1]:
+            raise APIResponseStatusCodeException(
+                'Ответ от эндпойнта отличается от 200: 503',
+                HTTPStatus.SERVICE_UNAVAILABLE,
+            )
+        state = self.homeworks[token]
+        self._advance(state, now)
+        homeworks = []
+        if self.clock.start + state.updated >= from_date:
+            homeworks.append({
+                'id': 1,
+                'homework_name': f'{token}.zip',
+                'status': state.status,
+            })
+            if state.status == state.reported:
+                # Статус успел смениться дважды между опросами:
+                # подписчик промежуточный так и не увидел.
+                self.missed += 1
+                state.pending = None
+        return {
+            'homeworks': homeworks,
+            'current_date': int(self.clock.time()),
+        }
+
+    def delivered(self, token, status):
+        """Уведомление о статусе отправлено: задержка от его смены."""
+        state = self.homeworks[token]
+        state.reported = status
+        if state.pending is not None:
+            self.latencies.append(self.clock.monotonic() - state.pending)
+            state.pending = None
+
+
+class SimulatedApiHandler(BaseHTTPRequestHandler):
+    """SimulatedApi за HTTP: токен из заголовка Authorization."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        token = self.headers['Authorization'].split(' ', 1)[1]
+        try:
+            status, payload = HTTPStatus.OK, self.server.api.fetch(
+                token, int(query['from_date'][0])
+            )
+        except APIResponseStatusCodeException as error:
+            status, payload = error.status_code, {}
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--days', type=float, default=7,
+                        help='длительность в виртуальном времени, сутки')
+    parser.add_argument('--interval', type=float, default=600,
+                        help='интервал опроса подписки (RETRY_TIME), с')
+    parser.add_argument('--change-hours', type=float, default=12,
+                        help='средний промежуток между сменами статуса, ч')
+    parser.add_argument('--outage-at', type=float,
+                        help='начало недоступности API, ч от старта')
+    parser.add_argument('--outage-hours', type=float, default=1)
+    parser.add_argument('--http', action='store_true',
+                        help='запросы через HTTP к модели API')
+    parser.add_argument('--threads', action='store_true',
+                        help='вызовы в пуле потоков, как в работе бота')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='куда сохранить результат (JSON)')
+    parser.add_argument('--compare', help='файл предыдущего результата')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    return parser.parse_args(argv)
+
+
+def create_engine(args, clock, api, tenants, session=None):
+    """Движок с теми же компонентами, что и в работе бота."""
+    by_chat = {tenant.chat_id: tenant.token for tenant in tenants}
+    sent = Counter()
+
+    def send(chat_id, message):
+        for status, verdict in homework.HOMEWORK_STATUSES.items():
+            if message.endswith(verdict):
+                api.delivered(by_chat[chat_id], status)
+                sent['status'] += 1
+                return
+        sent['error'] += 1
+
+    if session is None:
+        fetch = api.fetch
+    else:
+        def fetch(token, timestamp):
+            return homework.request_api_stream(
+                token, timestamp, session, clock
+            )
+    engine = PollingEngine(
+        tenants,
+        fetch=fetch,
+        check_response=homework.check_api_response,
+        parse_status=homework.parse_status,
+        delivery=DeliveryQueue(send, clock=clock.monotonic),
+        policy=PollPolicy(args.interval, rng=random.Random(args.seed)),
+        notifier=ErrorNotifier(clock=clock.monotonic),
+        breaker=CircuitBreaker(clock=clock.monotonic),
+        clock=clock,
+    )
+    return engine, sent
+
+
+def run(args):
+    logging.disable(logging.CRITICAL)
+    # Настенное время симуляции начинается с круглой секунды, как
+    # current_date у API.
+    clock = VirtualClock(start=int(time.time()))
+    outage = None
+    if args.outage_at is not None:
+        start = args.outage_at * 3600
+        outage = (start, start + args.outage_hours * 3600)
+    tenants = [
+        Tenant(f'token-{number}', number) for number in range(args.tenants)
+    ]
+    api = SimulatedApi(
+        clock, tenants, args.change_hours * 3600, outage, args.seed
+    )
+    duration = args.days * 86400
+    started = time.perf_counter()
+    if args.http:
+        server = StubServer(SimulatedApiHandler)
+        server.api = api
+        with server:
+            homework.ENDPOINT = (
+                f'{server.url}/api/user_api/homework_statuses/'
+            )
+            session = http_client.create_session(homework.HTTP_POOL_SIZE)
+            engine, sent = create_engine(
+                args, clock, api, tenants, session
+            )
+            clock.run(engine.run(), duration, inline=not args.threads)
+            session.close()
+    else:
+        engine, sent = create_engine(args, clock, api, tenants)
+        clock.run(engine.run(), duration, inline=not args.threads)
+    elapsed = time.perf_counter() - started
+
+    print(f'виртуальное время {args.days:g} сут за {elapsed:.1f} с '
+          f'(x{duration / elapsed:,.0f}); запросов к API {api.calls}, '
+          f'уведомлений {sent["status"]}, об ошибках {sent["error"]}')
+    latencies = api.latencies
+    return {
+        'api_calls_per_tenant_day': (
+            api.calls / args.tenants / args.days
+        ),
+        'peak_calls_per_second': max(api.per_second.values(), default=0),
+        'notify_p50_s': statistics.median(latencies or [0]),
+        'notify_p99_s': percentile(latencies, 0.99),
+        'missed_statuses': api.missed,
+        'simulated_seconds_per_second': duration / elapsed,
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run(args)
+    report = {
+        'revision': git_revision(),
+        'params': {
+            key: value for key, value in vars(args).items()
+            if key not in ('output', 'compare', 'tolerance')
+        },
+        'results': results,
+    }
+    for name, value in results.items():
+        print(f'{name:<30} {value:>12.2f}')
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)
+        # Скорость симуляции зависит от машины и не сравнивается.
+        if compare(results, baseline['results'], args.tolerance,
+                   HIGHER_IS_BETTER):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""Локальные заглушки внешних API для бенчмарков."""
+import json
+import multiprocessing
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class PracticumStubHandler(BaseHTTPRequestHandler):
+    """Ответы в формате эндпоинта homework_statuses."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        query = parse_qs(urlparse(self.path).query)
+        from_date = int(float(query.get('from_date', ['0'])[0]))
+        with server.lock:
+            server.requests += 1
+            requests = server.requests
+            if server.first_request is None:
+                server.first_request = time.perf_counter()
+        homeworks = server.homeworks
+        if server.change_every:
+            # Статус всех работ меняется каждые change_every запросов.
+            status = STATUSES[(requests // server.change_every) % 3]
+            homeworks = [
+                dict(homework, status=status) for homework in homeworks
+            ]
+        body = json.dumps({
+            'homeworks': homeworks,
+            'current_date': max(from_date, int(time.time())),
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class BotApiStubHandler(BaseHTTPRequestHandler):
+    """Минимальный Bot API: принимает sendMessage.
+    На getMe, getUpdates и deleteWebhook отвечает так, чтобы Updater
+    (команды бота) запускался без ошибок.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        method = self.path.rsplit('/', 1)[-1]
+        if method in SERVICE_RESULTS:
+            if method == 'getUpdates':
+                # Долгий опрос без обновлений.
+                time.sleep(min(float(payload.get('timeout') or 0), 1))
+            self._reply(SERVICE_RESULTS[method])
+            return
+        if server.latency:
+            time.sleep(server.latency)
+        with server.lock:
+            server.requests += 1
+            message_id = server.requests
+        self._reply({
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': int(payload.get('chat_id', 0)), 'type': 'private'},
+            'text': payload.get('text', ''),
+        })
+
+    def _reply(self, result):
+        body = json.dumps({'ok': True, 'result': result}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+SERVICE_RESULTS = {
+    'getMe': {'id': 123, 'is_bot': True, 'first_name': 'stub',
+              'username': 'stub_bot'},
+    'getUpdates': [],
+    'deleteWebhook': True,
+}
+
+
+class StubServer(ThreadingHTTPServer):
+    """HTTP-сервер заглушки, работающий в фоновом потоке."""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, handler, latency=0.0, homeworks=None, change_every=0):
+        super().__init__(('127.0.0.1', 0), handler)
+        self.latency = latency
+        self.homeworks = homeworks or []
+        self.change_every = change_every
+        self.requests = 0
+        self.first_request = None
+        self.lock = threading.Lock()
+        self._thread = None
+
+    def handle_error(self, request, client_address):
+        # Бот остановлен посреди ответа: для заглушки это не ошибка.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+STATUSES = ('reviewing', 'rejected', 'approved')
+
+
+def _serve(handler, options, urls):
+    server = StubServer(handler, **options)
+    urls.put(server.url)
+    server.serve_forever()
+
+
+class StubProcess:
+    """Заглушка в отдельном процессе.
+    Так сервер не отнимает у бота процессор и GIL во время замеров.
+    """
+
+    def __init__(self, handler, **options):
+        self.handler = handler
+        self.options = options
+        self.url = None
+        self._process = None
+
+    def __enter__(self):
+        urls = multiprocessing.Queue()
+        self._process = multiprocessing.Process(
+            target=_serve, args=(self.handler, self.options, urls),
+            daemon=True,
+        )
+        self._process.start()
+        self.url = urls.get(timeout=10)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._process.terminate()
+        self._process.join()
+
+
+def make_homeworks(count, status='reviewing'):
+    """Список из count домашних работ с указанным статусом."""
+    return [
+        {
+            'id': number,
+            'status': status,
+            'homework_name': f'homework_{number}.zip',
+            'reviewer_comment': '',
+            'date_updated': '2022-01-01T00:00:00Z',
+            'lesson_name': f'Урок {number}',
+        }
+        for number in range(count)
+    ]
@@ -0,0 +1,58 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Кеш с ограничением размера (LRU) и времени жизни записей.
+    Потокобезопасен: читается из обработчиков команд, а пишется
+    движком опроса.
+    """
+
+    def __init__(self, maxsize, ttl, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def get(self, key, stale=False):
+        """Значение или None, если записи нет или она устарела.
+        С stale=True возвращается и устаревшее значение: устаревшие
+        записи хранятся, пока их не вытеснят новые.
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires <= self.clock() and not stale:
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, self.clock() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_load(self, key, loader):
+        """Значение из кеша, а если его нет — результат loader().
+        Одновременные промахи по одному ключу вызывают loader один раз.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            value = self.get(key)
+            if value is None:
+                value = loader()
+                self.set(key, value)
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return value
@@ -0,0 +1,104 @@
+import logging
+import time
+from collections import deque
+
+import constants
+
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Предохранитель для API Практикума, общий для всех подписок.
+    Считает долю сбоев среди последних window запросов. Если она
+    достигает failure_rate, запросы запрещаются на reset_timeout секунд,
+    после чего пропускается один пробный запрос: успех закрывает
+    предохранитель, сбой снова открывает его.
+    """
+
+    def __init__(self, failure_rate=constants.BREAKER_FAILURE_RATE,
+                 window=constants.BREAKER_WINDOW,
+                 min_calls=constants.BREAKER_MIN_CALLS,
+                 reset_timeout=constants.BREAKER_RESET_TIMEOUT,
+                 clock=time.monotonic):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._results = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_started = None
+
+    @property
+    def state(self):
+        if (self._state == OPEN
+                and self.clock() - self._opened_at >= self.reset_timeout):
+            self._set_state(HALF_OPEN)
+        return self._state
+
+    def allow(self):
+        """Можно ли сейчас выполнить запрос к API."""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == OPEN:
+            return False
+        # В полуоткрытом состоянии пропускаем ровно один пробный запрос.
+        # Если проба зависла, через reset_timeout разрешаем новую.
+        now = self.clock()
+        if (self._probe_started is None
+                or now - self._probe_started >= self.reset_timeout):
+            self._probe_started = now
+            return True
+        return False
+
+    def retry_in(self):
+        """Через сколько секунд стоит снова спросить allow()."""
+        if self._state == OPEN:
+            return max(
+                0.0, self._opened_at + self.reset_timeout - self.clock()
+            )
+        if self._state == HALF_OPEN:
+            return min(1.0, self.reset_timeout)
+        return 0.0
+
+    def record_success(self):
+        if self._state == HALF_OPEN:
+            self._results.clear()
+            self._probe_started = None
+            self._set_state(CLOSED)
+        self._results.append(True)
+
+    def record_failure(self):
+        if self._state == HALF_OPEN:
+            self._probe_started = None
+            self._open()
+            return
+        self._results.append(False)
+        if self._state == CLOSED and len(self._results) >= self.min_calls:
+            failures = self._results.count(False)
+            if failures / len(self._results) >= self.failure_rate:
+                self._open()
+
+    def stats(self):
+        results = len(self._results)
+        return {
+            'state': self.state,
+            'failure_rate': (
+                self._results.count(False) / results if results else 0.0
+            ),
+        }
+
+    def _open(self):
+        self._opened_at = self.clock()
+        self._set_state(OPEN)
+
+    def _set_state(self, state):
+        if state != self._state:
+            logger.warning('Предохранитель API: %s -> %s', self._state, state)
+            self._state = state
@@ -0,0 +1,115 @@
+import asyncio
+import selectors
+import time
+
+
+class SystemClock:
+    """Реальное время: time() — настенные часы, monotonic() — для
+    интервалов и сроков опроса.
+    """
+
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def new_event_loop(self):
+        return asyncio.new_event_loop()
+
+
+SYSTEM_CLOCK = SystemClock()
+
+
+class VirtualClock:
+    """Виртуальное время для симуляции.
+    Часы стоят, пока их не переведут через advance(); цикл событий
+    из new_event_loop() переводит их сам, когда ждать больше нечего,
+    кроме таймеров. Так недели опроса проходят за секунды.
+    """
+
+    def __init__(self, start=None):
+        self.start = time.time() if start is None else start
+        self.now = 0.0
+
+    def time(self):
+        return self.start + self.now
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += max(0.0, seconds)
+
+    def new_event_loop(self, inline=True):
+        return VirtualTimeLoop(self, inline)
+
+    def run(self, coroutine, duration=None, inline=True):
+        """Выполняет coroutine в виртуальном времени.
+        С duration задача отменяется, когда виртуальное время дойдёт
+        до этого срока; возвращается результат или None при отмене.
+        """
+        loop = self.new_event_loop(inline)
+        try:
+            task = loop.create_task(coroutine)
+            if duration is not None:
+                loop.call_at(self.now + duration, task.cancel)
+            try:
+                return loop.run_until_complete(task)
+            except asyncio.CancelledError:
+                return None
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """Цикл событий на часах VirtualClock.
+    inline=True: вызовы run_in_executor выполняются сразу в потоке
+    цикла — симуляция однопоточная и воспроизводимая. Иначе они идут
+    в пуле потоков, и пока хоть один не завершился, время стоит,
+    а цикл по-настоящему ждёт его результата.
+    """
+
+    def __init__(self, clock, inline=True):
+        super().__init__(_VirtualSelector(clock))
+        self.clock = clock
+        self.inline = inline
+
+    def time(self):
+        return self.clock.now
+
+    def run_in_executor(self, executor, func, *args):
+        if self.inline:
+            future = self.create_future()
+            try:
+                future.set_result(func(*args))
+            except Exception as error:
+                future.set_exception(error)
+            return future
+        future = super().run_in_executor(executor, func, *args)
+        self._selector.pending += 1
+        future.add_done_callback(self._executor_done)
+        return future
+
+    def _executor_done(self, future):
+        self._selector.pending -= 1
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    """Вместо ожидания таймера переводит часы к его сроку."""
+
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+        self.pending = 0
+
+    def select(self, timeout=None):
+        events = super().select(0)
+        if events or timeout == 0:
+            return events
+        if self.pending or timeout is None:
+            # Ждём пул потоков или внешний ввод-вывод по-настоящему.
+            return super().select(None)
+        self.clock.advance(timeout)
+        return []
@@ -0,0 +1,155 @@
+import logging
+import threading
+
+import constants
+import exceptions
+from circuit_breaker import OPEN
+
+
+logger = logging.getLogger(__name__)
+
+# from_date=0 возвращает все работы подписки.
+FULL_HISTORY = 0
+
+
+class StatusCommands:
+    """Команды /status и /list.
+    Ответ берётся из кеша последнего полного списка работ подписки.
+    Движок опроса дополняет кеш изменениями, поэтому API Практикума
+    вызывается только при отсутствии или устаревании записи. Пока
+    предохранитель API breaker открыт, API не вызывается.
+    """
+
+    def __init__(self, tenants, fetch, check_response, verdicts, cache,
+                 breaker=None):
+        self.fetch = fetch
+        self.breaker = breaker
+        self.check_response = check_response
+        self.verdicts = verdicts
+        self.cache = cache
+        self._by_chat = {}
+        for tenant in tenants:
+            for chat_id in tenant.chat_ids:
+                self._by_chat.setdefault(str(chat_id), []).append(tenant)
+
+    def register(self, dispatcher):
+        from telegram.ext import CommandHandler
+        dispatcher.add_handler(CommandHandler('status', self.status))
+        dispatcher.add_handler(CommandHandler('list', self.list))
+
+    def homeworks(self, tenant):
+        """Все работы подписки, из кеша или из API.
+        При открытом предохранителе — из кеша, даже устаревшего,
+        а без записи в кеше — CircuitOpenException.
+        """
+        if self.breaker is not None and self.breaker.state == OPEN:
+            cached = self.cache.get(tenant.id, stale=True)
+            if cached is None:
+                raise exceptions.CircuitOpenException(
+                    'Предохранитель API открыт'
+                )
+            return cached
+        return self.cache.get_or_load(
+            tenant.id,
+            lambda: list(self.check_response(
+                self.fetch(tenant.token, FULL_HISTORY)
+            )),
+        )
+
+    def apply_changes(self, tenant, changed):
+        """Обновляет закешированный список работ изменениями из опроса."""
+        if not changed:
+            return
+        cached = self.cache.get(tenant.id)
+        if cached is None:
+            return
+        updated = {homework.key for homework in changed}
+        merged = list(changed) + [
+            homework for homework in cached if homework.key not in updated
+        ]
+        self.cache.set(tenant.id, merged)
+
+    def describe(self, homework):
+        verdict = self.verdicts.get(homework.status, homework.status)
+        return f'"{homework.name}": {verdict}'
+
+    def status(self, update, context):
+        """Статус последней работы."""
+        self._reply(update, lambda homeworks: [self.describe(homeworks[0])])
+
+    def list(self, update, context):
+        """Статусы всех работ."""
+        self._reply(
+            update,
+            lambda homeworks: [self.describe(item) for item in homeworks],
+        )
+
+    def _reply(self, update, render):
+        tenants = self._by_chat.get(str(update.effective_chat.id))
+        if not tenants:
+            update.effective_message.reply_text(
+                'Этот чат не подписан на статусы домашних работ'
+            )
+            return
+        lines = []
+        for tenant in tenants:
+            try:
+                homeworks = self.homeworks(tenant)
+            except exceptions.CircuitOpenException:
+                lines.append('API Практикума недоступно, попробуйте позже')
+                continue
+            except Exception as error:
+                logger.error('Ошибка ответа на команду: %s', error)
+                lines.append('Не удалось получить статус, попробуйте позже')
+                continue
+            if not homeworks:
+                lines.append('Работ на проверке пока нет')
+                continue
+            lines.extend(render(homeworks))
+        update.effective_message.reply_text('\n'.join(lines))
+
+
+class CommandPoller:
+    """Приём команд бота долгим опросом getUpdates.
+    Telegram отвечает 409 Conflict на параллельные getUpdates с одним
+    токеном, поэтому команды принимает только одна реплика — ведущая.
+    Остановленный Updater повторно не запускается, поэтому при каждом
+    start() создаётся новый.
+    """
+
+    def __init__(self, commands, bot, workers=constants.COMMAND_WORKERS):
+        self.commands = commands
+        self.bot = bot
+        self.workers = workers
+        self._updater = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._updater is not None
+
+    def start(self):
+        from telegram.ext import Updater
+        with self._lock:
+            if self._updater is not None:
+                return
+            updater = Updater(bot=self.bot, workers=self.workers)
+            self.commands.register(updater.dispatcher)
+            updater.start_polling()
+            self._updater = updater
+        logger.info('Приём команд бота запущен')
+
+    def stop(self):
+        with self._lock:
+            updater, self._updater = self._updater, None
+            if updater is None:
+                return
+            updater.stop()
+        logger.info('Приём команд бота остановлен')
+
+    def lead(self, leading):
+        """Для LeaseKeeper: команды принимает только ведущая реплика."""
+        if leading:
+            self.start()
+        else:
+            self.stop()
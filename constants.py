@@ -1 +1,55 @@
 FALSE_CURRENT_TIMESTAMP = 10
+POLL_CONCURRENCY = 64
+HTTP_POOL_SIZE = 64
+HTTP_CONNECT_TIMEOUT = 5
+HTTP_READ_TIMEOUT = 30
+TELEGRAM_POOL_SIZE = 16
+STORAGE_PATH = 'homework_bot.sqlite3'
+TELEGRAM_GLOBAL_RATE = 30
+TELEGRAM_CHAT_RATE = 1
+DELIVERY_MAX_RETRIES = 5
+# Как часто удалять вёдра лимита простаивающих чатов, секунд.
+DELIVERY_BUCKET_SWEEP = 60
+ERROR_NOTIFY_WINDOW = 3600
+BREAKER_FAILURE_RATE = 0.5
+BREAKER_WINDOW = 20
+BREAKER_MIN_CALLS = 10
+BREAKER_RESET_TIMEOUT = 60
+RETRY_TIME = 600
+BACKOFF_BASE = 30
+BACKOFF_MAX = 3600
+POLL_JITTER = 0.1
+STATUS_INTERVAL_FACTORS = {
+    'reviewing': 0.5,
+    'rejected': 1.0,
+    'approved': 2.0,
+}
+LOG_QUEUE_SIZE = 10000
+METRICS_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30,
+)
+STATUS_CACHE_SIZE = 10000
+STATUS_CACHE_TTL = 300
+COMMAND_WORKERS = 4
+STREAM_THRESHOLD = 256 * 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+WORKER_PROCESSES = 1
+HASH_RING_REPLICAS = 128
+WORKER_RESTART_BASE = 1
+WORKER_RESTART_MAX = 60
+WORKER_STOP_TIMEOUT = 10
+LEASE_TTL = 60
+# Аренда ведущей реплики: она одна принимает команды бота.
+LEADER_LEASE = 'leader'
+OUTBOX_BATCH = 100
+OUTBOX_RETRY_BASE = 30
+OUTBOX_RETRY_MAX = 3600
+OUTBOX_MAX_ATTEMPTS = 50
+OUTBOX_CLAIM_TTL = 600
+OUTBOX_RETENTION = 7 * 24 * 3600
+WATCHDOG_INTERVAL = 1
+WATCHDOG_STALL_THRESHOLD = 120
+WATCHDOG_HEARTBEAT_TIMEOUT = 3600
+PROFILE_DIR = 'profiles'
+PROFILE_SAMPLE_INTERVAL = 0.01
+TRACEMALLOC_FRAMES = 25
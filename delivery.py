@@ -0,0 +1,308 @@
+import asyncio
+import collections
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import constants
+import metrics
+from scheduler import DeadlineScheduler
+
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Ограничитель частоты «ведро токенов» с резервированием.
+    Токены можно занять в долг: reserve() сразу возвращает, сколько
+    ждать до своей очереди, поэтому порядок отправки сохраняется.
+    """
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate, capacity, now=None):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now):
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def reserve(self, now):
+        """Занимает токен и возвращает задержку в секундах."""
+        self._refill(now)
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def full(self, now):
+        """Ведро полно: оно ничем не отличается от нового."""
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+    def wait(self, now):
+        """Сколько секунд ждать свободного токена, не занимая его."""
+        self._refill(now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def block(self, now, seconds):
+        """Следующий токен станет доступен не раньше чем через seconds."""
+        self._refill(now)
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+
+class DeliveryQueue:
+    """Очередь исходящих сообщений Telegram.
+    Опрос кладёт сообщения в очередь, а обработчики отправляют их,
+    соблюдая общий лимит бота и лимит на каждый чат.
+    У каждого чата своя очередь, а чаты ждут своего слота в куче по
+    времени готовности: сообщения в один чат уходят по порядку и не
+    занимают обработчики, пока чат ждёт, поэтому очередь в групповой
+    чат не задерживает остальные. Общий лимит расходуется, только
+    когда чат готов к отправке. Ответ 429 с retry_after
+    приостанавливает отправку в этот чат.
+    """
+
+    def __init__(self, send, workers=constants.TELEGRAM_POOL_SIZE,
+                 global_rate=constants.TELEGRAM_GLOBAL_RATE,
+                 chat_rate=constants.TELEGRAM_CHAT_RATE,
+                 max_retries=constants.DELIVERY_MAX_RETRIES,
+                 clock=time.monotonic):
+        self.send = send
+        self.clock = clock
+        self.workers = workers
+        self.chat_rate = chat_rate
+        self.max_retries = max_retries
+        self._global_bucket = TokenBucket(global_rate, global_rate, clock())
+        self._chat_buckets = {}
+        self._swept = clock()
+        self._chats = {}
+        self._ready = DeadlineScheduler()
+        self._busy = set()
+        self._waiting = 0
+        self._queue = None
+        self._wakeup = None
+        self._executor = None
+        self._tasks = []
+        self._started = None
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+    def set_global_rate(self, rate):
+        """Новый общий лимит, например после смены числа шардов."""
+        bucket = self._global_bucket
+        bucket.rate = bucket.capacity = rate
+        bucket.tokens = min(bucket.tokens, rate)
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._wakeup = asyncio.Event()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix='delivery'
+        )
+        self._started = self.clock()
+        self._tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._dispatch()))
+        metrics.DELIVERY_QUEUE_DEPTH.set_function(self.depth)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        # Недоставленные сообщения не будут отправлены.
+        while not self._queue.empty():
+            self._queue.get_nowait()[2].cancel()
+        for pending in self._chats.values():
+            for item in pending:
+                item[2].cancel()
+        self._chats.clear()
+        self._ready = DeadlineScheduler()
+        self._busy.clear()
+        self._waiting = 0
+
+    def deliver(self, chat_id, text, on_start=None):
+        """Ставит сообщение в очередь.
+        Возвращает future, которое завершится после отправки.
+        Корутина on_start() ожидается перед каждой попыткой отправки;
+        если future отменено до неё, сообщение не отправляется.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._put((chat_id, text, future, 0, on_start))
+        return future
+
+    def depth(self):
+        """Сообщений в очереди, отправка которых ещё не началась."""
+        return self._waiting + (self._queue.qsize() if self._queue else 0)
+
+    def stats(self):
+        """Счётчики очереди: глубина, отправлено, ошибки, скорость."""
+        elapsed = self.clock() - self._started if self._started else 0
+        return {
+            'queue_depth': self.depth(),
+            'sent': self.sent,
+            'failed': self.failed,
+            'retried': self.retried,
+            'sent_per_second': self.sent / elapsed if elapsed else 0.0,
+        }
+
+    def _chat_bucket(self, chat_id, now):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, 1, now)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _put(self, item, first=False):
+        """Добавляет сообщение в очередь чата (повтор — в её начало)."""
+        chat_id = item[0]
+        pending = self._chats.get(chat_id)
+        if pending is None:
+            pending = self._chats[chat_id] = collections.deque()
+        if first:
+            pending.appendleft(item)
+        else:
+            pending.append(item)
+        self._waiting += 1
+        self._schedule_chat(chat_id)
+        now = self.clock()
+        if now - self._swept >= constants.DELIVERY_BUCKET_SWEEP:
+            self._swept = now
+            self._evict_buckets(now)
+
+    def _evict_buckets(self, now):
+        """Удаляет вёдра чатов без сообщений, уже наполнившиеся:
+        иначе на каждый чат, куда хоть раз писали, оставалось бы ведро.
+        """
+        for chat_id, bucket in list(self._chat_buckets.items()):
+            if (chat_id not in self._chats and chat_id not in self._busy
+                    and bucket.full(now)):
+                del self._chat_buckets[chat_id]
+
+    def _schedule_chat(self, chat_id):
+        """Ставит чат в кучу к сроку его следующего слота."""
+        if (chat_id in self._busy or chat_id in self._ready
+                or chat_id not in self._chats):
+            return
+        now = self.clock()
+        self._ready.schedule(
+            chat_id, now + self._chat_bucket(chat_id, now).wait(now)
+        )
+        self._wakeup.set()
+
+    def _take(self, chat_id):
+        """Следующее неотменённое сообщение чата или None."""
+        pending = self._chats.get(chat_id)
+        item = None
+        while pending and item is None:
+            item = pending.popleft()
+            self._waiting -= 1
+            if item[2].done():
+                item = None
+        if not pending:
+            self._chats.pop(chat_id, None)
+        return item
+
+    async def _dispatch(self):
+        """Передаёт обработчикам сообщения чатов, чей слот наступил."""
+        loop = asyncio.get_running_loop()
+        while True:
+            now = self.clock()
+            due = self._ready.next_due()
+            if due is not None and due <= now:
+                due = now + self._global_bucket.wait(now)
+            if due is None or due > now:
+                self._wakeup.clear()
+                timer = None
+                if due is not None:
+                    timer = loop.call_later(due - now, self._wakeup.set)
+                try:
+                    await self._wakeup.wait()
+                finally:
+                    if timer is not None:
+                        timer.cancel()
+                continue
+            for chat_id in self._ready.pop_due(now, limit=1):
+                item = self._take(chat_id)
+                if item is None:
+                    continue
+                self._global_bucket.reserve(now)
+                self._chat_bucket(chat_id, now).reserve(now)
+                self._busy.add(chat_id)
+                self._queue.put_nowait(item)
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            chat_id, text, future, attempt, on_start = item
+            try:
+                if future.done():
+                    continue
+                if on_start is not None:
+                    await on_start()
+                await loop.run_in_executor(
+                    self._executor, self._timed_send, chat_id, text
+                )
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as error:
+                if not self._retry(item, error):
+                    self._settle(future, error)
+            else:
+                self._settle(future)
+            finally:
+                self._queue.task_done()
+                self._busy.discard(chat_id)
+                self._schedule_chat(chat_id)
+
+    def _settle(self, future, error=None):
+        """Итог отправки: счётчики и результат future."""
+        if error is None:
+            self.sent += 1
+            metrics.DELIVERY_SENT.inc()
+            if not future.done():
+                future.set_result(None)
+            return
+        self.failed += 1
+        metrics.DELIVERY_FAILED.inc()
+        if not future.done():
+            future.set_exception(error)
+
+    def _retry(self, item, error):
+        """Ответ 429: сообщение возвращается в начало очереди чата,
+        а чат приостанавливается на retry_after. Возвращает True, если
+        будет повтор.
+        """
+        chat_id, text, future, attempt, on_start = item
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is None or attempt >= self.max_retries:
+            return False
+        self._pause_chat(chat_id, retry_after)
+        self.retried += 1
+        logger.warning(
+            'Telegram просит подождать %s с перед отправкой в чат %s',
+            retry_after, chat_id,
+        )
+        self._put((chat_id, text, future, attempt + 1, on_start), first=True)
+        return True
+
+    def _timed_send(self, chat_id, text):
+        with metrics.track('send_message'):
+            self.send(chat_id, text)
+
+    def _pause_chat(self, chat_id, retry_after):
+        """Сдвигает ближайший свободный слот чата на retry_after секунд."""
+        now = self.clock()
+        self._chat_bucket(chat_id, now).block(now, retry_after)
@@ -0,0 +1,397 @@
+import asyncio
+import contextvars
+import itertools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import constants
+import exceptions
+from clock import SYSTEM_CLOCK
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from error_notifier import ErrorNotifier
+import metrics
+import streaming
+from log_config import log_context
+from scheduler import DeadlineScheduler
+from status_index import StatusIndex
+
+
+logger = logging.getLogger(__name__)
+
+BREAKER_STATES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def is_outage(error):
+    """Признак недоступности API, а не проблемы конкретной подписки."""
+    if isinstance(error, exceptions.APIResponseStatusCodeException):
+        return (error.status_code is None
+                or error.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR
+                or error.status_code == HTTPStatus.TOO_MANY_REQUESTS)
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+class PollingEngine:
+    """Асинхронный опрос API Практикума для множества подписок.
+    Подписки лежат в очереди по сроку следующего опроса, движок
+    просыпается только к ближайшему сроку. Сетевые вызовы блокирующие,
+    поэтому выполняются в пуле потоков, а параллельность ограничена
+    семафором. Время берётся из clock: с VirtualClock движок работает
+    в симуляции без реальных пауз.
+    """
+
+    def __init__(self, tenants, fetch, check_response, parse_status, delivery,
+                 policy, concurrency=constants.POLL_CONCURRENCY,
+                 storage=None, notifier=None, breaker=None,
+                 on_homeworks=None, clock=None, outbox=None,
+                 watchdog=None):
+        self.tenants = {tenant.id: tenant for tenant in tenants}
+        self.fetch = fetch
+        self.check_response = check_response
+        self.parse_status = parse_status
+        self.delivery = delivery
+        self.policy = policy
+        self.concurrency = concurrency
+        self.storage = storage
+        self.index = StatusIndex(storage, self.tenants)
+        self.clock = clock or SYSTEM_CLOCK
+        self.notifier = notifier or ErrorNotifier(clock=self.clock.monotonic)
+        self.breaker = breaker or CircuitBreaker(clock=self.clock.monotonic)
+        self.on_homeworks = on_homeworks
+        self.outbox = outbox
+        self.watchdog = watchdog
+        self.scheduler = DeadlineScheduler()
+        self._executor = None
+        self._semaphore = None
+        self._wakeup = None
+        self._running = set()
+        self._requests = itertools.count(1)
+        # Чаты, уже получившие статус, который пока не удалось доставить
+        # в остальные чаты подписки: {id подписки: {(работа, статус): чаты}}.
+        self._sent = {}
+
+    async def run(self):
+        """Запуск опроса всех подписок до отмены."""
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix='poll'
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._wakeup = asyncio.Event()
+        now = int(self.clock.time())
+        cursors = self.storage.load_cursors() if self.storage else {}
+        started = self.clock.monotonic()
+        for tenant in self.tenants.values():
+            tenant.cursor = cursors.get(tenant.id, tenant.cursor)
+            if tenant.cursor is None:
+                tenant.cursor = now
+            # Случайно разносим первые запросы по интервалу опроса,
+            # чтобы тысячи подписок не стартовали в одну секунду.
+            self.scheduler.schedule(
+                tenant.id, started + self.policy.initial_delay()
+            )
+        logger.info('Запущен опрос подписок: %s', len(self.tenants))
+        metrics.TENANTS.set_function(lambda: len(self.tenants))
+        metrics.BREAKER_STATE.set_function(
+            lambda: BREAKER_STATES[self.breaker.state]
+        )
+        await self.delivery.start()
+        background = []
+        if self.outbox is not None:
+            background.append(asyncio.create_task(self.outbox.run()))
+        if self.watchdog is not None:
+            background.append(asyncio.create_task(self.watchdog.monitor()))
+        try:
+            await self._dispatch()
+        finally:
+            for task in list(self._running):
+                task.cancel()
+            await asyncio.gather(*self._running, return_exceptions=True)
+            # Outbox останавливается раньше очереди доставки, чтобы
+            # вернуть в очередь ещё не начатые отправки.
+            for task in background:
+                task.cancel()
+            await asyncio.gather(*background, return_exceptions=True)
+            await self.delivery.stop()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _dispatch(self):
+        """Будит движок только к ближайшему сроку опроса."""
+        loop = asyncio.get_running_loop()
+        while True:
+            due = self.scheduler.next_due()
+            now = self.clock.monotonic()
+            if due is None or due > now:
+                self._wakeup.clear()
+                # Таймер вместо wait_for: без лишней задачи на каждое
+                # пробуждение, что заметно при тысячах подписок.
+                timer = None
+                if due is not None:
+                    timer = loop.call_later(due - now, self._wakeup.set)
+                try:
+                    await self._wakeup.wait()
+                finally:
+                    if timer is not None:
+                        timer.cancel()
+                continue
+            if self.watchdog:
+                # Опоздание самой ранней из запускаемых подписок.
+                self.watchdog.dispatched(now - due)
+            for key in self.scheduler.pop_due(now):
+                task = asyncio.create_task(self._poll_and_reschedule(key))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+    def add_tenant(self, tenant, due=None):
+        """Подключение подписки на ходу, например после перебалансировки
+        шардов. Курсор и статусы берутся из общего хранилища, поэтому
+        подписка продолжает опрос с места, где её оставил прежний шард.
+        due — срок первого опроса по clock.time(), если он известен.
+        """
+        if tenant.id in self.tenants:
+            return
+        cursor = self.storage.load_cursor(tenant.id) if self.storage else None
+        tenant.cursor = cursor or tenant.cursor or int(self.clock.time())
+        self.index.load(tenant.id)
+        self.tenants[tenant.id] = tenant
+        if due is None:
+            delay = self.policy.initial_delay()
+        else:
+            delay = max(0, due - self.clock.time())
+        self._reschedule(tenant, delay)
+
+    def remove_tenant(self, key):
+        """Отключение подписки. Идущий опрос доработает, но новый
+        назначен не будет.
+        """
+        if self.tenants.pop(key, None) is None:
+            return
+        self.scheduler.remove(key)
+        self.index.forget(key)
+        self._sent.pop(key, None)
+
+    def due_times(self):
+        """Сроки следующего опроса подписок по clock.time().
+        Для подписок, опрос которых идёт сейчас, — через интервал опроса.
+        """
+        now = self.clock.time()
+        offset = now - self.clock.monotonic()
+        dues = {}
+        for key in self.tenants:
+            due = self.scheduler.due(key)
+            dues[key] = (
+                now + self.policy.interval if due is None else due + offset
+            )
+        return dues
+
+    def _reschedule(self, tenant, delay):
+        if self.tenants.get(tenant.id) is not tenant:
+            # Подписку отключили, пока шёл её опрос.
+            return
+        due = self.clock.monotonic() + delay
+        earliest = self.scheduler.next_due()
+        self.scheduler.schedule(tenant.id, due)
+        if self._wakeup and (earliest is None or due < earliest):
+            self._wakeup.set()
+
+    async def _poll_and_reschedule(self, key):
+        tenant = self.tenants.get(key)
+        if tenant is None:
+            return
+        # Задача работает в своей копии контекста, поэтому поля лога
+        # не смешиваются между подписками.
+        log_context.set({'tenant': key, 'request': next(self._requests)})
+        if self.breaker.state == OPEN:
+            self._postpone(tenant)
+            return
+        try:
+            error = await self.poll(tenant)
+        except exceptions.CircuitOpenException:
+            self._postpone(tenant)
+            return
+        finally:
+            if self.watchdog:
+                self.watchdog.beat(key)
+        tenant.failures = tenant.failures + 1 if error else 0
+        self._reschedule(tenant, self.policy.next_delay(
+            tenant.failures,
+            getattr(error, 'retry_after', None),
+            self.index.statuses(tenant.id),
+        ))
+
+    def _postpone(self, tenant):
+        """API недоступно: откладываем подписку до пробного запроса,
+        не тратя запросы на заведомо неработающий эндпоинт.
+        """
+        self._reschedule(
+            tenant, self.breaker.retry_in() + self.policy.spread()
+        )
+        if self.watchdog:
+            self.watchdog.beat(tenant.id)
+
+    async def _call(self, key, func, *args):
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        async with self._semaphore:
+            # Пока опрос ждал семафор, предохранитель мог открыться:
+            # разрешение спрашивается прямо перед запросом.
+            if not self.breaker.allow():
+                raise exceptions.CircuitOpenException(
+                    'Предохранитель API открыт'
+                )
+            # Зависание считается с начала запроса: опросы в очереди
+            # к семафору не зависли, а ждут.
+            if self.watchdog:
+                self.watchdog.poll_started(key)
+            try:
+                return await loop.run_in_executor(
+                    self._executor, context.run, func, *args
+                )
+            finally:
+                if self.watchdog:
+                    self.watchdog.poll_finished(key)
+
+    async def poll(self, tenant):
+        """Один цикл опроса подписки: запрос, проверка, уведомления.
+        Возвращает ошибку опроса или None. Если предохранитель не
+        пропустил запрос, поднимается CircuitOpenException.
+        """
+        try:
+            started = time.perf_counter()
+            response, changed = await self._fetch(tenant)
+            if self.on_homeworks:
+                self.on_homeworks(tenant, changed)
+            if not changed:
+                logger.debug('Новый статус не обнаружен')
+            with metrics.track('parse_status'):
+                messages = [
+                    self.parse_status(homework) for homework in changed
+                ]
+            if self.outbox is not None:
+                delivered = await self._enqueue(tenant, changed, messages)
+            else:
+                delivered = await self._fan_out(tenant, changed, messages)
+                if changed:
+                    metrics.POLL_TO_NOTIFY.observe(
+                        time.perf_counter() - started
+                    )
+            # Если что-то не отправилось, курсор не сдвигаем:
+            # следующий опрос вернёт эти работы снова.
+            if delivered:
+                self._advance_cursor(
+                    tenant, streaming.current_date(response)
+                )
+        except (asyncio.CancelledError, exceptions.CircuitOpenException):
+            raise
+        except Exception as error:
+            logger.error('Сбой в работе программы: %s', error)
+            self._notify(tenant, self.notifier.on_error(tenant.id, error))
+            return error
+        self._notify(tenant, self.notifier.on_success(tenant.id))
+        return None
+
+    async def _enqueue(self, tenant, changed, messages):
+        """Запись изменений в Outbox: статусы и уведомления сохраняются
+        одной транзакцией, а отправка идёт отдельно и не задерживает
+        опрос.
+        """
+        if changed:
+            await self.outbox.enqueue(tenant, changed, messages)
+            for homework in changed:
+                self.index.update(tenant.id, homework, persist=False)
+        return True
+
+    async def _fan_out(self, tenant, changed, messages):
+        """Рассылка изменений во все чаты подписки одновременно.
+        Статус попадает в индекс, когда доставлен во все чаты; чаты,
+        которые его уже получили, при повторе пропускаются.
+        Возвращает True, если доставлено всё.
+        """
+        if not changed:
+            return True
+        sent = self._sent.setdefault(tenant.id, {})
+        deliveries = [
+            (homework, chat_id, message)
+            for homework, message in zip(changed, messages)
+            for chat_id in tenant.chat_ids
+            if chat_id not in sent.get((homework.key, homework.status), ())
+        ]
+        results = await asyncio.gather(*(
+            self.delivery.deliver(chat_id, message)
+            for _, chat_id, message in deliveries
+        ), return_exceptions=True)
+        failed = set()
+        for (homework, chat_id, _), result in zip(deliveries, results):
+            if isinstance(result, Exception):
+                failed.add(homework.key)
+                logger.error('Ошибка отправки сообщения: %s', result)
+            else:
+                sent.setdefault(
+                    (homework.key, homework.status), set()
+                ).add(chat_id)
+        for homework in changed:
+            if homework.key in failed:
+                continue
+            self.index.update(tenant.id, homework)
+        # Отметки о частичной доставке нужны только для недоставленного:
+        # прежние статусы тех же работ больше не повторятся.
+        for entry in list(sent):
+            if entry[0] not in failed:
+                del sent[entry]
+        if not sent:
+            del self._sent[tenant.id]
+        return not failed
+
+    async def _fetch(self, tenant):
+        """Запрос к API с учётом предохранителя.
+        Возвращает ответ и список работ с изменившимся статусом.
+        """
+        try:
+            result = await self._call(
+                tenant.id, self._fetch_changes, tenant
+            )
+        except exceptions.CircuitOpenException:
+            raise
+        except Exception as error:
+            if is_outage(error):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def _fetch_changes(self, tenant):
+        """Запрос, проверка и сравнение с индексом за один проход.
+        Выполняется в потоке пула: потоковый ответ читается из сети
+        по мере разбора, в памяти остаются только изменившиеся работы.
+        Опрос одной подписки не идёт параллельно с самим собой, поэтому
+        её записи в индексе в это время не меняются.
+        """
+        with metrics.track('get_api_answer'):
+            response = self.fetch(tenant.token, tenant.cursor)
+        with metrics.track('check_response'):
+            changed = self.index.diff(
+                tenant.id, self.check_response(response)
+            )
+        return response, changed
+
+    def _notify(self, tenant, message):
+        """Служебное уведомление без ожидания доставки."""
+        if message is None:
+            return
+        future = self.delivery.deliver(tenant.chat_id, message)
+        future.add_done_callback(self._log_delivery_error)
+
+    @staticmethod
+    def _log_delivery_error(future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error('Ошибка отправки сообщения: %s', future.exception())
+
+    def _advance_cursor(self, tenant, current_date):
+        """Следующий опрос начнётся с current_date из ответа API."""
+        if current_date is None or current_date == tenant.cursor:
+            return
+        tenant.cursor = current_date
+        if self.storage:
+            self.storage.save_cursor(tenant.id, current_date)
@@ -0,0 +1,56 @@
+import re
+import time
+
+import constants
+
+
+RECOVERED_MESSAGE = 'Работа бота восстановлена'
+
+
+# Адреса объектов (0x7f...) в тексте ошибок urllib3, затем любые числа.
+ADDRESS = re.compile(r'0x[0-9a-fA-F]+')
+NUMBER = re.compile(r'[0-9]+')
+
+
+def fingerprint(error):
+    """Отпечаток ошибки: тип и текст без адресов и чисел.
+    Адреса объектов, время, порты и коды не делают ошибку новой.
+    """
+    text = NUMBER.sub('N', ADDRESS.sub('ADDR', str(error)))
+    return f'{type(error).__name__}: {text}'
+
+
+class ErrorNotifier:
+    """Дедупликация уведомлений об ошибках.
+    Одинаковая ошибка отправляется один раз за окно window секунд,
+    а после восстановления уходит одно сообщение об этом. Время
+    отправки хранится для каждого отпечатка, поэтому чередующиеся
+    ошибки тоже не повторяются.
+    """
+
+    def __init__(self, window=constants.ERROR_NOTIFY_WINDOW,
+                 clock=time.monotonic):
+        self.window = window
+        self.clock = clock
+        self._active = {}
+
+    def on_error(self, key, error):
+        """Текст уведомления или None, если его нужно подавить."""
+        now = self.clock()
+        current = fingerprint(error)
+        sent = self._active.setdefault(key, {})
+        last_sent = sent.get(current)
+        if last_sent is not None and now - last_sent < self.window:
+            return None
+        # Отпечатки с истёкшим окном больше ничего не подавляют.
+        for old in [old for old, at in sent.items()
+                    if now - at >= self.window]:
+            del sent[old]
+        sent[current] = now
+        return f'Сбой в работе программы: {error}'
+
+    def on_success(self, key):
+        """Сообщение о восстановлении, если перед этим был сбой."""
+        if self._active.pop(key, None) is None:
+            return None
+        return RECOVERED_MESSAGE
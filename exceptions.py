@@ -13,7 +13,14 @@ class UnknownHWStatusException(Exception):
 class APIResponseStatusCodeException(Exception):
     """Исключение сбоя запроса к API."""
 
-    pass
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CircuitOpenException(Exception):
+    """Запрос не выполнен: предохранитель API открыт."""
 
 
 class CheckResponseException(Exception):
@@ -26,3 +33,9 @@ class SendMessageFailure(Exception):
     """Исключение отправки сообщения."""
 
     pass
+
+
+class ChatUnavailableException(SendMessageFailure):
+    """Чат недоступен боту: не найден или бот заблокирован.
+    Повтор отправки не поможет.
+    """
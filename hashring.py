@@ -0,0 +1,39 @@
+import bisect
+import hashlib
+
+import constants
+
+
+def _point(value):
+    """Положение строки на кольце: первые 8 байт md5."""
+    digest = hashlib.md5(value.encode()).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+class HashRing:
+    """Консистентное хеширование подписок по процессам-шардам.
+    У каждого шарда много виртуальных точек на кольце, ключ принадлежит
+    шарду ближайшей точки по часовой стрелке. При смене числа шардов
+    с K на K + 1 переезжает примерно 1 / (K + 1) подписок, и все они —
+    на новый шард.
+    """
+
+    def __init__(self, shards, replicas=constants.HASH_RING_REPLICAS):
+        if shards < 1:
+            raise ValueError('Число шардов должно быть положительным')
+        self.shards = shards
+        ring = sorted(
+            (_point(f'{shard}:{replica}'), shard)
+            for shard in range(shards)
+            for replica in range(replicas)
+        )
+        self._points = [point for point, _ in ring]
+        self._owners = [shard for _, shard in ring]
+
+    def shard_for(self, key):
+        """Номер шарда, которому принадлежит ключ."""
+        index = bisect.bisect(self._points, _point(key))
+        return self._owners[index % len(self._owners)]
+
+    def owns(self, shard, key):
+        return self.shard_for(key) == shard
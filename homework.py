@@ -1,28 +1,110 @@
+import asyncio
 import logging
 import os
+import signal
 import sys
+import threading
 import time
 
-import requests
-import telegram
-from dotenv import load_dotenv
 from http import HTTPStatus
 
 import exceptions
 import constants
-
-
-load_dotenv()
-
-
-PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
-TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
-TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
-
-
-RETRY_TIME = 600
-ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
-HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+import http_client
+import metrics
+import streaming
+from backoff import PollPolicy, parse_retry_after
+from delivery import DeliveryQueue
+from cache import TTLCache
+from circuit_breaker import CircuitBreaker
+from clock import SYSTEM_CLOCK
+from commands import CommandPoller, StatusCommands
+from engine import PollingEngine
+from error_notifier import ErrorNotifier
+from hashring import HashRing
+from journal import JournalWriter
+from liveness import Watchdog
+from leases import LeaseKeeper, LeaseManager, replica_owner
+from log_config import setup_logging
+from models import Homework
+from outbox import Outbox
+from profiling import Profiler
+from storage import Storage
+from streaming import HomeworkStream
+from supervisor import Supervisor, rebalance
+from tenants import Tenant, load_tenants, parse_chat_ids, tenant_id
+
+
+def env_flag(name, default=''):
+    """Логический флаг из переменной окружения."""
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes')
+
+
+def configure():
+    """Настройки из переменных окружения."""
+    global PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_API_URL, \
+        TELEGRAM_CHAT_ID, TENANTS_FILE, BOT_COMMANDS, METRICS_PORT, \
+        LOG_JSON, LOG_LEVEL, HTTP_POOL_SIZE, STORAGE_PATH, BACKOFF_BASE, \
+        BACKOFF_MAX, ERROR_NOTIFY_WINDOW, TELEGRAM_GLOBAL_RATE, \
+        TELEGRAM_POOL_SIZE, WORKER_PROCESSES, LEASES, LEASE_TTL, \
+        REPLICA_ID, JOURNAL_PATH, OUTBOX, HEARTBEAT_PATH, \
+        WATCHDOG_STALL_THRESHOLD, HEARTBEAT_TIMEOUT, PROFILE_DIR, \
+        HTTP_TIMEOUT, RETRY_TIME, ENDPOINT, HEADERS
+    PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
+    TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
+    TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL')
+    TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+    TENANTS_FILE = os.getenv('TENANTS_FILE')
+    BOT_COMMANDS = env_flag('BOT_COMMANDS', '1')
+    METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+    LOG_JSON = env_flag('LOG_JSON')
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    HTTP_POOL_SIZE = int(
+        os.getenv('HTTP_POOL_SIZE', constants.HTTP_POOL_SIZE)
+    )
+    STORAGE_PATH = os.getenv('STORAGE_PATH', constants.STORAGE_PATH)
+    BACKOFF_BASE = float(os.getenv('BACKOFF_BASE', constants.BACKOFF_BASE))
+    BACKOFF_MAX = float(os.getenv('BACKOFF_MAX', constants.BACKOFF_MAX))
+    ERROR_NOTIFY_WINDOW = float(
+        os.getenv('ERROR_NOTIFY_WINDOW', constants.ERROR_NOTIFY_WINDOW)
+    )
+    TELEGRAM_GLOBAL_RATE = float(
+        os.getenv('TELEGRAM_GLOBAL_RATE', constants.TELEGRAM_GLOBAL_RATE)
+    )
+    TELEGRAM_POOL_SIZE = int(
+        os.getenv('TELEGRAM_POOL_SIZE', constants.TELEGRAM_POOL_SIZE)
+    )
+    WORKER_PROCESSES = int(
+        os.getenv('WORKER_PROCESSES', constants.WORKER_PROCESSES)
+    )
+    LEASES = env_flag('LEASES', '1')
+    LEASE_TTL = float(os.getenv('LEASE_TTL', constants.LEASE_TTL))
+    REPLICA_ID = os.getenv('REPLICA_ID')
+    JOURNAL_PATH = os.getenv('JOURNAL_PATH')
+    OUTBOX = env_flag('OUTBOX', '1')
+    HEARTBEAT_PATH = os.getenv('HEARTBEAT_PATH')
+    WATCHDOG_STALL_THRESHOLD = float(os.getenv(
+        'WATCHDOG_STALL_THRESHOLD', constants.WATCHDOG_STALL_THRESHOLD
+    ))
+    HEARTBEAT_TIMEOUT = float(os.getenv(
+        'HEARTBEAT_TIMEOUT', constants.WATCHDOG_HEARTBEAT_TIMEOUT
+    ))
+    PROFILE_DIR = os.getenv('PROFILE_DIR', constants.PROFILE_DIR)
+    HTTP_TIMEOUT = (
+        float(os.getenv(
+            'HTTP_CONNECT_TIMEOUT', constants.HTTP_CONNECT_TIMEOUT
+        )),
+        float(os.getenv('HTTP_READ_TIMEOUT', constants.HTTP_READ_TIMEOUT)),
+    )
+    RETRY_TIME = int(os.getenv('RETRY_TIME', constants.RETRY_TIME))
+    ENDPOINT = os.getenv(
+        'PRACTICUM_ENDPOINT',
+        'https://practicum.yandex.ru/api/user_api/homework_statuses/',
+    )
+    HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+
+
+configure()
 
 
 HOMEWORK_STATUSES = {
@@ -31,78 +113,241 @@ HOMEWORK_STATUSES = {
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
 
-formatter = logging.Formatter(
-    '%(asctime)s %(levelname)s %(message)s - строка %(lineno)s'
-)
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
-handler = logging.StreamHandler(sys.stdout)
 
-logger.addHandler(handler)
-handler.setFormatter(formatter)
+_initialized = False
+
+
+def init():
+    """Подготовка к запуску: .env, настройки и логирование.
+    Вызывается из main() и в каждом процессе-шарде, а не при импорте,
+    чтобы импорт модуля (тесты, бенчмарки, перезапуск шарда) оставался
+    дешёвым и без побочных эффектов.
+    """
+    global _initialized
+    if _initialized:
+        return
+    _initialized = True
+    from dotenv import load_dotenv
+    load_dotenv()
+    configure()
+    setup_logging(LOG_JSON, LOG_LEVEL)
+
+
+# Журнал обменов с API (JOURNAL_PATH); открывается в run_shard().
+JOURNAL = None
+
+_bot_instance = None
+_bot_lock = threading.Lock()
 
 
 def get_bot():
     """Создаёт бота.
     Для обращения к нему из любой части кода.
+    Бот создаётся один раз и переиспользуется всеми отправками,
+    соединения к Bot API берутся из общего пула.
     """
-    try:
-        bot = telegram.Bot(token=TELEGRAM_TOKEN)
-        logger.debug('Бот успешно инициализирован')
-        return bot
-    except Exception as error:
-        logger.error(
-            f'Бота не удалось запустить по причине {error}'
-        )
+    global _bot_instance
+    if _bot_instance is not None:
+        return _bot_instance
+    import telegram
+    from telegram.utils.request import Request
+    # Первая отправка может прийти сразу из нескольких потоков доставки.
+    with _bot_lock:
+        if _bot_instance is not None:
+            return _bot_instance
+        try:
+            request = Request(
+                con_pool_size=TELEGRAM_POOL_SIZE,
+                connect_timeout=HTTP_TIMEOUT[0],
+                read_timeout=HTTP_TIMEOUT[1],
+            )
+            _bot_instance = telegram.Bot(
+                token=TELEGRAM_TOKEN, base_url=TELEGRAM_API_URL,
+                request=request,
+            )
+            logger.debug('Бот успешно инициализирован')
+            return _bot_instance
+        except Exception as error:
+            logger.error('Бота не удалось запустить по причине %s', error)
 
 
 def send_message(bot, message):
-    """Отправка сообщения ботом."""
+    """Отправка сообщения ботом во все чаты TELEGRAM_CHAT_ID."""
+    for chat_id in parse_chat_ids(TELEGRAM_CHAT_ID):
+        send_chat_message(bot, chat_id, message)
+
+
+def send_chat_message(bot, chat_id, message):
+    """Отправка сообщения ботом в указанный чат."""
+    import telegram
+    started = time.perf_counter()
+    failure = None
     try:
         bot.send_message(
-            chat_id=TELEGRAM_CHAT_ID,
+            chat_id=chat_id,
             text=message,
         )
         logger.info('Сообщение в чат отправлено')
+    except telegram.error.RetryAfter as error:
+        # Превышен лимит Telegram: очередь доставки повторит отправку.
+        logger.warning('Превышен лимит отправки сообщений: %s', error)
+        failure = error
+        raise
     except Exception as error:
-        logger.error(
-            f'Ошибка при отправке сообщения в чат {error}'
-        )
+        logger.error('Ошибка при отправке сообщения в чат %s', error)
+        failure = error
+        if is_chat_unavailable(error):
+            raise exceptions.ChatUnavailableException(
+                f'Чат {chat_id} недоступен: {error}'
+            )
         error = 'Ошибка при отправке сообщения в чат'
         raise exceptions.SendMessageFailure(error)
+    finally:
+        if JOURNAL is not None:
+            JOURNAL.record_send(
+                chat_id, message, failure, time.perf_counter() - started
+            )
+
+
+def is_chat_unavailable(error):
+    """Ошибка Telegram, которую повтор отправки не исправит.
+
+    Это 400 (чат не найден) или 403 (бот заблокирован или удалён
+    из чата). 401 — неверный токен бота — касается всех чатов и сюда
+    не относится.
+    """
+    import telegram
+    if isinstance(error, telegram.error.BadRequest):
+        return True
+    return (isinstance(error, telegram.error.Unauthorized)
+            and error.message.startswith('Forbidden'))
+
+
+def get_headers(token):
+    """Заголовки авторизации для токена Практикума."""
+    return {'Authorization': f'OAuth {token}'}
 
 
 def get_api_answer(current_timestamp):
     """Получение ответа API в формате python."""
+    return request_api_answer(PRACTICUM_TOKEN, current_timestamp)
+
+
+def request_api_answer(token, current_timestamp, session=None,
+                       clock=SYSTEM_CLOCK):
+    """Получение ответа API для указанного токена.
+    session — общая сессия с пулом соединений; по умолчанию запрос
+    выполняется без неё, через модуль requests.
+    """
+    started = time.perf_counter()
+    response = send_api_request(token, current_timestamp, session,
+                                clock=clock)
+    if JOURNAL is not None:
+        journal_api(token, current_timestamp, response, started)
+    return response.json()
+
+
+def request_api_stream(token, current_timestamp, session=None,
+                       clock=SYSTEM_CLOCK):
+    """Ответ API для потоковой обработки.
+    Небольшой ответ разбирается целиком (быстрее, если есть orjson),
+    большой — читается частями через HomeworkStream.
+    """
+    started = time.perf_counter()
+    response = send_api_request(
+        token, current_timestamp, session, stream=True, clock=clock
+    )
+    try:
+        length = response.headers.get('Content-Length')
+        if length is not None and int(length) <= constants.STREAM_THRESHOLD:
+            if JOURNAL is not None:
+                journal_api(token, current_timestamp, response, started)
+            return streaming.loads(response.content)
+        chunks = response.iter_content(constants.STREAM_CHUNK_SIZE)
+        if JOURNAL is not None:
+            chunks = JOURNAL.tee(chunks, lambda body: journal_api(
+                token, current_timestamp, response, started, body
+            ))
+    except BaseException:
+        # Непрочитанный потоковый ответ не вернёт соединение в пул.
+        response.close()
+        raise
+    return HomeworkStream(chunks, close=response.close)
+
+
+def journal_api(token, current_timestamp, response, started, body=None):
+    """Запись обмена с API в журнал; токен заменяется id подписки."""
+    JOURNAL.record_api(
+        tenant_id(token),
+        current_timestamp,
+        response.status_code,
+        response.content if body is None else body,
+        time.perf_counter() - started,
+    )
+
+
+def send_api_request(token, current_timestamp, session=None,
+                     stream=False, clock=SYSTEM_CLOCK):
+    """Запрос к API с проверкой кода ответа.
+    Некорректная метка времени заменяется текущим временем clock.
+    """
+    # requests загружается при первом запросе, а не при импорте модуля.
+    import requests
+    if session is None:
+        session = requests
     bad_format = False
     if isinstance(int, float):
         logger.warning(
-            ('Тип current_timestamp не соответствует '
-             f'ожидаемому: {type}')
+            'Тип current_timestamp не соответствует ожидаемому: %s', type
         )
         bad_format = True
-    if len(str(int(current_timestamp))) != constants.FALSE_CURRENT_TIMESTAMP:
+    if (current_timestamp != 0 and len(str(int(current_timestamp)))
+            != constants.FALSE_CURRENT_TIMESTAMP):
         logger.warning(
-            ('В переменную current_timestamp передано '
-             f'некорректное число: {current_timestamp}')
+            'В переменную current_timestamp передано некорректное число: %s',
+            current_timestamp,
         )
         bad_format = True
     if bad_format:
-        timestamp = int(time.time())
+        timestamp = int(clock.time())
     else:
         timestamp = current_timestamp
     params = {'from_date': timestamp}
-    logger.debug(params)
+    logger.debug('Параметры запроса: %s', params)
 
+    started = time.perf_counter()
     try:
-        response = requests.get(ENDPOINT, headers=HEADERS, params=params)
-    except exceptions.APIResponseStatusCodeException:
-        logger.error('Сбой при запросе к эндпоинту')
-    if response.status_code != HTTPStatus.OK:
-        msg = 'Ответ от эндпойнта отличается от 200'
+        response = session.get(
+            ENDPOINT,
+            headers=get_headers(token),
+            params=params,
+            timeout=HTTP_TIMEOUT,
+            stream=stream,
+        )
+    except requests.exceptions.RequestException as error:
+        msg = f'Сбой при запросе к эндпоинту: {error}'
         logger.error(msg)
         raise ConnectionError(msg)
-    return response.json()
+    if response.status_code != HTTPStatus.OK:
+        msg = f'Ответ от эндпойнта отличается от 200: {response.status_code}'
+        logger.error(msg)
+        if JOURNAL is not None:
+            journal_api(token, current_timestamp, response, started)
+        # С stream=True тело не прочитано: без close() соединение
+        # так и останется занятым и не вернётся в пул.
+        response.close()
+        retry_after = None
+        if response.status_code in (
+            HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.SERVICE_UNAVAILABLE
+        ):
+            retry_after = parse_retry_after(
+                response.headers.get('Retry-After')
+            )
+        raise exceptions.APIResponseStatusCodeException(
+            msg, response.status_code, retry_after
+        )
+    return response
 
 
 def check_response(response):
@@ -123,26 +368,36 @@ def check_response(response):
     return homeworks
 
 
+def check_api_response(response):
+    """check_response для обычного и потокового ответа.
+    Возвращает итератор записей Homework; поток проверяется
+    по мере чтения.
+    """
+    if isinstance(response, HomeworkStream):
+        homeworks = response
+    else:
+        homeworks = check_response(response)
+    return map(Homework.from_dict, homeworks)
+
+
 def parse_status(homework):
-    """Определяет статус последней работы."""
-    if 'homework_name' not in homework:
-        raise KeyError('Отсутствует ключ "homework_name" в ответе API')
-    if 'status' not in homework:
-        raise Exception('Отсутствует ключ "status" в ответе API')
-    homework_name = homework['homework_name']
-    homework_status = homework['status']
+    """Определяет статус последней работы.
+    Принимает словарь из ответа API или запись Homework.
+    """
+    if not isinstance(homework, Homework):
+        homework = Homework.from_dict(homework)
+    homework_status = homework.status
     logger.info('Запущена функция "parse_status"')
-    logger.debug(f'Получен статус домашней работы: {homework_status}')
+    logger.debug('Получен статус домашней работы: %s', homework_status)
     try:
         verdict = HOMEWORK_STATUSES[homework_status]
     except Exception as error:
-        message = f'Недокументированный статус домашней работы({error})'
-        logger.error(message)
+        logger.error('Недокументированный статус домашней работы(%s)', error)
         raise exceptions.UnknownHWStatusException(
             'Недокументированный статус домашней работы'
         )
     else:
-        homework_name = homework['homework_name']
+        homework_name = homework.name
         return f'Изменился статус проверки работы "{homework_name}".{verdict}'
 
 
@@ -173,46 +428,231 @@ def check_tokens():
     return True
 
 
-def main():
-    """Основная логика работы бота."""
+def get_tenants():
+    """Список подписок для опроса.
+    Из файла TENANTS_FILE или из переменных окружения.
+    """
+    if TENANTS_FILE:
+        if TELEGRAM_TOKEN is None:
+            logger.critical('Нет переменных окружения: TELEGRAM_TOKEN')
+            sys.exit()
+        return load_tenants(TENANTS_FILE)
     if not check_tokens():
         logger.critical('Переданы не все обязательные переменные окружения')
         sys.exit()
+    return [Tenant(PRACTICUM_TOKEN, parse_chat_ids(TELEGRAM_CHAT_ID))]
 
-    while True:
-        try:
-            current_timestamp = int(time.time())
-            response = get_api_answer(current_timestamp)
-            homeworks = check_response(response)
-            denied_message = 'Ошибка отправки сообщения'
-            previous_status = None
-
-            if homeworks is False:
-                wrong_response = 'Получен некорректный ответ API'
-                logger.debug(wrong_response)
-            if len(homeworks) != 0:
-                new_status = parse_status(homeworks[0])
-                logger.debug(f'parse_status выдала "{new_status}"')
-                send_message(get_bot(), new_status)
-            else:
-                new_status = previous_status
-                logger.debug('Новый статус не обнаружен')
-
-                current_timestamp = response.get('current_date')
-
-        except exceptions.SendMessageFailure as exc:
-            denied_message = f'Ошибка отправки сообщения: {exc}'
-            logger.error(denied_message)
 
-        except Exception as error:
-            message = f'Сбой в работе программы: {error}'
-            logger.error(message)
-            if denied_message != message:
-                denied_message = message
-            send_message(get_bot(), message)
+def create_commands(tenants, session, breaker=None):
+    """Обработчики команд /status и /list.
+    breaker — предохранитель движка опроса того же процесса.
+    """
+    return StatusCommands(
+        tenants,
+        fetch=lambda token, timestamp: request_api_answer(
+            token, timestamp, session
+        ),
+        check_response=check_api_response,
+        verdicts=HOMEWORK_STATUSES,
+        cache=TTLCache(
+            constants.STATUS_CACHE_SIZE, constants.STATUS_CACHE_TTL
+        ),
+        breaker=breaker,
+    )
+
+
+def create_engine(tenants, bot, session, storage, commands=None, shards=1,
+                  clock=SYSTEM_CLOCK, watchdog=None, breaker=None):
+    """Движок опроса с настройками из переменных окружения.
+    Общий лимит Telegram делится между шардами поровну.
+    Без bot бот создаётся при первой отправке сообщения. С OUTBOX
+    уведомления проходят через постоянную очередь в storage.
+    """
+    delivery = DeliveryQueue(
+        send=lambda chat_id, message: send_chat_message(
+            bot or get_bot(), chat_id, message
+        ),
+        workers=TELEGRAM_POOL_SIZE,
+        global_rate=TELEGRAM_GLOBAL_RATE / shards,
+        clock=clock.monotonic,
+    )
+    return PollingEngine(
+        tenants,
+        fetch=lambda token, timestamp: request_api_stream(
+            token, timestamp, session, clock
+        ),
+        check_response=check_api_response,
+        parse_status=parse_status,
+        delivery=delivery,
+        policy=PollPolicy(RETRY_TIME, BACKOFF_BASE, BACKOFF_MAX),
+        concurrency=HTTP_POOL_SIZE,
+        storage=storage,
+        notifier=ErrorNotifier(ERROR_NOTIFY_WINDOW, clock.monotonic),
+        breaker=breaker or CircuitBreaker(clock=clock.monotonic),
+        on_homeworks=commands.apply_changes if commands else None,
+        clock=clock,
+        outbox=(
+            Outbox(storage, delivery, clock) if OUTBOX and storage else None
+        ),
+        watchdog=watchdog,
+    )
+
+
+def on_control(engine, tenants, shard, control, task, keeper=None):
+    """Команда надзирателя: новое число шардов."""
+    try:
+        shards = control.recv()
+    except EOFError:
+        # Надзиратель завершился: шард без него не работает.
+        logger.critical('Потеряна связь с надзирателем, шард %s', shard)
+        asyncio.get_running_loop().remove_reader(control.fileno())
+        task.cancel()
+        return
+    if keeper is not None:
+        # Подписки шарда поменяются через аренду.
+        ring = HashRing(shards)
+        keeper.set_candidates(
+            [tenant for tenant in tenants if ring.owns(shard, tenant.id)],
+            scope=f'{shard}/{shards}',
+        )
+        logger.info('Шард %s из %s', shard, shards)
+        return
+    engine.delivery.set_global_rate(TELEGRAM_GLOBAL_RATE / shards)
+    added, removed = rebalance(engine, tenants, shard, shards)
+    logger.info(
+        'Шард %s из %s: подключено подписок %s, отключено %s',
+        shard, shards, added, removed,
+    )
+
+
+def create_lease_keeper(engine, tenants, storage, shard, shards,
+                        on_leader=None):
+    """Аренда подписок шарда между репликами бота.
+    Лимит Telegram делится между репликами пропорционально
+    арендованным подпискам. on_leader — см. LeaseKeeper.
+    """
+    ring = HashRing(shards)
+    manager = LeaseManager(
+        storage,
+        owner=replica_owner(REPLICA_ID, shard),
+        scope=f'{shard}/{shards}',
+        ttl=LEASE_TTL,
+    )
+    return LeaseKeeper(
+        engine,
+        manager,
+        [tenant for tenant in tenants if ring.owns(shard, tenant.id)],
+        on_change=lambda owned: engine.delivery.set_global_rate(
+            TELEGRAM_GLOBAL_RATE * max(owned, 1) / len(tenants)
+        ),
+        on_leader=on_leader,
+    )
+
+
+async def serve(engine, tenants, shard, control, keeper=None,
+                profiler=None):
+    """Опрос до отмены; SIGTERM завершает его штатно.
+    SIGUSR1 и SIGUSR2 включают и выключают профилирование.
+    """
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+    loop.add_signal_handler(signal.SIGTERM, task.cancel)
+    if profiler is not None:
+        profiler.install(loop)
+    if control is not None:
+        loop.add_reader(
+            control.fileno(), on_control,
+            engine, tenants, shard, control, task, keeper,
+        )
+    if keeper is None:
+        await engine.run()
+    else:
+        await asyncio.gather(engine.run(), keeper.run())
 
-        finally:
-            time.sleep(RETRY_TIME)
+
+def run_shard(shard=0, shards=1, control=None):
+    """Опрос подписок одного шарда.
+    Шард 0 также отвечает на команды бота за все подписки.
+    С арендой (LEASES) шард опрашивает только подписки, арендованные
+    им у общей базы, и несколько реплик бота не опрашивают одну
+    подписку дважды; команды принимает шард 0 только ведущей реплики.
+    """
+    global JOURNAL
+    init()
+    tenants = get_tenants()
+    ring = HashRing(shards)
+    owned = [tenant for tenant in tenants if ring.owns(shard, tenant.id)]
+    bot = None
+    session = http_client.create_session(HTTP_POOL_SIZE)
+    storage = Storage(STORAGE_PATH)
+    watchdog = Watchdog(
+        stall_threshold=WATCHDOG_STALL_THRESHOLD,
+        heartbeat_timeout=HEARTBEAT_TIMEOUT,
+        heartbeat_path=(
+            HEARTBEAT_PATH if shards == 1 or not HEARTBEAT_PATH
+            else f'{HEARTBEAT_PATH}.{shard}'
+        ),
+    )
+    watchdog.start()
+    if METRICS_PORT:
+        metrics.start_http_server(
+            METRICS_PORT + shard, health=watchdog.status
+        )
+    # Общий для опроса и команд: при недоступном API команды его не
+    # дёргают.
+    breaker = CircuitBreaker()
+    commands = None
+    poller = None
+    if BOT_COMMANDS and shard == 0:
+        commands = create_commands(tenants, session, breaker)
+        bot = get_bot()
+        poller = CommandPoller(commands, bot)
+        if not LEASES:
+            poller.start()
+    if JOURNAL_PATH:
+        JOURNAL = JournalWriter(
+            JOURNAL_PATH if shards == 1 else f'{JOURNAL_PATH}.{shard}'
+        )
+    keeper = None
+    engine = create_engine(
+        [] if LEASES else owned, bot, session, storage, commands, shards,
+        watchdog=watchdog, breaker=breaker,
+    )
+    if LEASES:
+        # С арендой команды принимает только ведущая реплика.
+        keeper = create_lease_keeper(
+            engine, tenants, storage, shard, shards,
+            on_leader=poller.lead if poller else None,
+        )
+    try:
+        asyncio.run(serve(
+            engine, tenants, shard, control, keeper,
+            Profiler(PROFILE_DIR, prefix=f'shard{shard}'),
+        ))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        logger.info('Бот остановлен')
+    finally:
+        watchdog.stop()
+        if poller:
+            poller.stop()
+        session.close()
+        storage.close()
+        if JOURNAL is not None:
+            JOURNAL.close()
+
+
+def main():
+    """Основная логика работы бота."""
+    init()
+    if WORKER_PROCESSES <= 1:
+        run_shard()
+        return
+    # Конфигурацию проверяем до запуска шардов, чтобы не перезапускать
+    # их бесконечно из-за отсутствующих переменных окружения.
+    get_tenants()
+    supervisor = Supervisor(run_shard, WORKER_PROCESSES)
+    supervisor.install_signal_handlers()
+    supervisor.run()
 
 
 if __name__ == '__main__':
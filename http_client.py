@@ -0,0 +1,25 @@
+import constants
+
+
+def create_session(pool_size=constants.HTTP_POOL_SIZE):
+    """Общая сессия для запросов к API Практикума.
+    Соединения переиспользуются (keep-alive), поэтому TCP и TLS
+    рукопожатие выполняется один раз на соединение, а не на каждый опрос.
+    Размер пула стоит держать не меньше числа потоков опроса. Пул не
+    блокирует: requests не передаёт таймаут ожидания соединения, и при
+    исчерпании пула поток опроса ждал бы вечно. Лишнее соединение
+    открывается сверх пула и закрывается после запроса.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=pool_size,
+        pool_block=False,
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['Connection'] = 'keep-alive'
+    return session
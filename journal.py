@@ -0,0 +1,159 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+
+
+MAGIC = b'HWJ\x01'
+API = 1
+SEND = 2
+# Длина остатка записи, тип, время, длительность, длина метаданных.
+HEADER = struct.Struct('<IBdfH')
+LENGTH = struct.Struct('<I')
+
+Record = namedtuple(
+    'Record', ('kind', 'timestamp', 'duration', 'meta', 'body')
+)
+
+
+class JournalWriter:
+    """Журнал обменов с API только на дозапись.
+    Запись — префикс длины, заголовок фиксированного размера,
+    метаданные в JSON и тело ответа как есть. Пишется из потоков пула
+    опроса и доставки, поэтому каждая запись уходит одним write()
+    под блокировкой.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+
+    def record(self, kind, meta, body=b'', duration=0.0, timestamp=None):
+        meta = json.dumps(meta, separators=(',', ':')).encode()
+        header = HEADER.pack(
+            HEADER.size - LENGTH.size + len(meta) + len(body),
+            kind,
+            time.time() if timestamp is None else timestamp,
+            duration,
+            len(meta),
+        )
+        data = b''.join((header, meta, body))
+        with self._lock:
+            self._file.write(data)
+
+    def record_api(self, tenant, from_date, status, body, duration):
+        self.record(API, {
+            'tenant': tenant, 'from_date': from_date, 'status': status,
+        }, body, duration)
+
+    def record_send(self, chat_id, text, error, duration):
+        self.record(SEND, {
+            'chat_id': chat_id,
+            'error': type(error).__name__ if error else None,
+        }, text.encode(), duration)
+
+    def tee(self, chunks, on_complete):
+        """Пропускает части тела ответа дальше и по окончании передаёт
+        тело целиком в on_complete. Для записи журнала потоковый ответ
+        всё-таки собирается в памяти.
+        """
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        on_complete(b''.join(parts))
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class Journal:
+    """Чтение журнала через mmap без копирования тел.
+    Тело записи — memoryview на отображённый файл: его нужно
+    скопировать, если оно нужно после закрытия журнала. Оборванная
+    последняя запись (остановка посреди write()) пропускается.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            if size < len(MAGIC):
+                raise ValueError(f'Пустой журнал: {path}')
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ValueError(f'Файл не является журналом: {path}')
+        self._view = memoryview(self._map)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self):
+        view = self._view
+        position = len(MAGIC)
+        end = len(view)
+        while position + HEADER.size <= end:
+            length, kind, timestamp, duration, meta_length = (
+                HEADER.unpack_from(view, position)
+            )
+            record_end = position + LENGTH.size + length
+            if record_end > end:
+                return
+            meta_start = position + HEADER.size
+            body_start = meta_start + meta_length
+            yield Record(
+                kind,
+                timestamp,
+                duration,
+                json.loads(bytes(view[meta_start:body_start])),
+                view[body_start:record_end],
+            )
+            position = record_end
+
+    def close(self):
+        self._view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            # Тела записей ещё используются: отображение закроется,
+            # когда их соберёт сборщик мусора.
+            pass
+
+
+def replay(journal, handle, speed=None, kinds=(API,), sleep=time.sleep,
+           clock=time.monotonic):
+    """Прогон записей журнала через handle(record).
+    speed=None — с максимальной скоростью, иначе с сохранением
+    интервалов между записями, ускоренных в speed раз.
+    Возвращает число обработанных записей.
+    """
+    count = 0
+    origin = None
+    started = clock()
+    for record in journal:
+        if record.kind not in kinds:
+            continue
+        if speed:
+            if origin is None:
+                origin = record.timestamp
+            delay = (record.timestamp - origin) / speed - (clock() - started)
+            if delay > 0:
+                sleep(delay)
+        handle(record)
+        count += 1
+    return count
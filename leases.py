@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import math
+import os
+import socket
+import sqlite3
+import time
+
+import constants
+
+
+logger = logging.getLogger(__name__)
+
+
+def replica_owner(replica_id=None, shard=0):
+    """Имя владельца аренды: реплика и шард внутри неё.
+    Без REPLICA_ID используется DYNO (стабилен между перезапусками
+    на Heroku) или хост и pid.
+    """
+    replica = (replica_id or os.getenv('DYNO')
+               or f'{socket.gethostname()}:{os.getpid()}')
+    return f'{replica}/{shard}'
+
+
+class LeaseManager:
+    """Аренда подписок в общей базе SQLite.
+    Подписку опрашивает только реплика, держащая её аренду. Аренда
+    продлевается каждые ttl / 3, поэтому подписки упавшей реплики
+    освобождаются через ttl и достаются живым. Вместе с арендой хранится
+    срок следующего опроса, и новый владелец продолжает расписание
+    прежнего, а не опрашивает подписку внепланово.
+    """
+
+    def __init__(self, storage, owner, scope='', ttl=constants.LEASE_TTL,
+                 clock=time.time):
+        self.storage = storage
+        self.owner = owner
+        self.scope = scope
+        self.ttl = ttl
+        self.clock = clock
+        self.owned = set()
+        self.held = set()
+        self.valid_until = 0
+        self._replicas = 0
+        self._free = set()
+
+    def sync(self, candidates, dues):
+        """Продление, захват и освобождение аренды за один проход.
+        candidates — подписки, которые реплика может опрашивать,
+        dues — {подписка: срок следующего опроса} своих подписок.
+        Возвращает захваченные подписки {подписка: срок опроса или None}
+        и множество подписок, опрос которых надо прекратить.
+        """
+        now = self.clock()
+        expires = now + self.ttl
+        replicas = self.storage.heartbeat(
+            self.owner, self.scope, expires, now
+        )
+        dropped = self.owned - candidates
+        if dropped:
+            self.storage.release_leases(
+                self.owner, {key: dues.get(key) for key in dropped}
+            )
+        renewed = self.storage.renew_leases(self.owner, expires, {
+            key: dues.get(key) for key in self.owned & candidates
+        })
+        self.valid_until = expires
+        lost = self.owned - renewed - dropped
+        if lost:
+            logger.warning('Аренду подписок перехватили: %s', len(lost))
+        # Свои записи могли остаться от прошлого запуска реплики.
+        claimed = {
+            key: None for key in (renewed & candidates) - self.owned
+        }
+        owned = renewed & candidates
+
+        released = set()
+        share = math.ceil(len(candidates) / max(replicas, 1))
+        if replicas > self._replicas and len(owned) > share:
+            # Появилась новая реплика: отдаём ей излишек.
+            released = set(sorted(owned)[share:])
+            self.storage.release_leases(
+                self.owner, {key: dues.get(key) for key in released}
+            )
+            owned -= released
+            logger.info(
+                'Реплик: %s, передано подписок: %s', replicas, len(released)
+            )
+        self._replicas = replicas
+
+        held = self.storage.held_leases(now)
+        free = {key for key in candidates if key not in held}
+        room = max(share - len(owned), 0)
+        # Подписки, свободные уже второй проход подряд, забираем сверх
+        # доли: иначе их могло бы не опрашивать ни одна реплика.
+        wanted = set(sorted(free - self._free)[:room]) | (free & self._free)
+        claimed.update(self.storage.claim_leases(
+            self.owner, wanted, expires, now
+        ))
+        self._free = free - claimed.keys()
+        self.owned = owned | claimed.keys()
+        return claimed, dropped | lost | released
+
+    def hold(self, key):
+        """Продление или захват аренды key, которую держит только одна
+        реплика из всех, например ведущей реплики. Возвращает True,
+        пока аренда за этой репликой.
+        """
+        now = self.clock()
+        expires = now + self.ttl
+        held = (
+            key in self.storage.renew_leases(self.owner, expires, {key: None})
+            or key in self.storage.claim_leases(
+                self.owner, {key}, expires, now
+            )
+        )
+        if held:
+            self.held.add(key)
+        else:
+            self.held.discard(key)
+        return held
+
+    def release(self, dues):
+        """Освобождение всех подписок при остановке реплики."""
+        if self.owned or self.held:
+            self.storage.release_leases(self.owner, {
+                key: dues.get(key) for key in self.owned | self.held
+            })
+        self.storage.remove_replica(self.owner)
+        self.owned = set()
+        self.held = set()
+
+
+class LeaseKeeper:
+    """Согласует подписки движка с арендой.
+    Движок опрашивает только арендованные подписки; если продлить аренду
+    не удаётся дольше 2/3 ttl, опрос всех подписок прекращается раньше,
+    чем их сможет захватить другая реплика.
+    С on_leader реплика борется и за аренду LEADER_LEASE: on_leader(True)
+    вызывается, когда она стала ведущей, on_leader(False) — когда
+    перестала или останавливается.
+    """
+
+    def __init__(self, engine, manager, tenants, on_change=None,
+                 on_leader=None):
+        self.engine = engine
+        self.manager = manager
+        self.candidates = {tenant.id: tenant for tenant in tenants}
+        self.on_change = on_change
+        self.on_leader = on_leader
+        self.leading = False
+        self._changed = None
+
+    def set_candidates(self, tenants, scope=None):
+        """Новый набор подписок, например после перебалансировки шардов."""
+        self.candidates = {tenant.id: tenant for tenant in tenants}
+        if scope is not None:
+            self.manager.scope = scope
+        if self._changed:
+            self._changed.set()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        try:
+            while True:
+                self._changed.clear()
+                try:
+                    claimed, removed = await loop.run_in_executor(
+                        None, self.manager.sync,
+                        set(self.candidates), self.engine.due_times(),
+                    )
+                    leading = self.on_leader is not None and (
+                        await loop.run_in_executor(
+                            None, self.manager.hold, constants.LEADER_LEASE
+                        )
+                    )
+                except sqlite3.Error as error:
+                    logger.error('Не удалось продлить аренду: %s', error)
+                    if self._expire():
+                        await self._lead(False)
+                else:
+                    self._apply(claimed, removed)
+                    await self._lead(leading)
+                try:
+                    await asyncio.wait_for(
+                        self._changed.wait(), self.manager.ttl / 3
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            # Сначала перестаём быть ведущей, затем отдаём аренду:
+            # иначе две реплики на время стали бы ведущими.
+            if self.leading:
+                self.leading = False
+                self.on_leader(False)
+            try:
+                self.manager.release(self.engine.due_times())
+            except sqlite3.Error as error:
+                logger.error('Не удалось освободить аренду: %s', error)
+
+    def _apply(self, claimed, removed):
+        for key in removed:
+            self.engine.remove_tenant(key)
+        for key, due in claimed.items():
+            # Набор подписок мог смениться, пока шёл sync(); лишнюю
+            # аренду отпустит следующий проход.
+            tenant = self.candidates.get(key)
+            if tenant is not None:
+                self.engine.add_tenant(tenant, due)
+        if claimed or removed:
+            logger.info(
+                'Арендовано подписок: %s (+%s, -%s)',
+                len(self.manager.owned), len(claimed), len(removed),
+            )
+            if self.on_change:
+                self.on_change(len(self.manager.owned))
+
+    async def _lead(self, leading):
+        if leading == self.leading:
+            return
+        self.leading = leading
+        logger.info(
+            'Реплика стала ведущей' if leading
+            else 'Реплика больше не ведущая'
+        )
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.on_leader, leading
+        )
+
+    def _expire(self):
+        """Прекращает опрос, если аренда вот-вот истечёт.
+        Возвращает True, если опрос прекращён.
+        """
+        margin = self.manager.ttl / 3
+        if self.manager.clock() < self.manager.valid_until - margin:
+            return False
+        logger.critical('Аренда истекает, опрос подписок остановлен')
+        for key in list(self.engine.tenants):
+            self.engine.remove_tenant(key)
+        self.manager.owned = set()
+        self.manager.held = set()
+        return True
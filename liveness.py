@@ -0,0 +1,161 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+import constants
+import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+def format_stacks():
+    """Стеки всех потоков процесса, как в отчёте faulthandler."""
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    lines = []
+    for ident, frame in sys._current_frames().items():
+        lines.append(f'Поток {names.get(ident, ident)}:')
+        lines.extend(
+            line.rstrip() for line in traceback.format_stack(frame)
+        )
+    return '\n'.join(lines)
+
+
+class Watchdog:
+    """Контроль живости процесса.
+    Монитор в цикле событий каждые interval секунд измеряет задержку
+    цикла (lag), а движок отмечает начало и конец каждого запроса
+    к API и сообщает опоздание запуска опросов (scheduler_lag).
+    Отдельный поток проверяет, что цикл отвечает и ни один запрос
+    не висит дольше stall_threshold; иначе процесс считается неживым,
+    и стеки всех потоков один раз пишутся в лог — по ним видно, где
+    завис, например, запрос без таймаута. Готовность — опрос
+    завершался не позже heartbeat_timeout назад. С heartbeat_path
+    поток, пока процесс жив, раз в interval перезаписывает этот файл.
+    """
+
+    def __init__(self, interval=constants.WATCHDOG_INTERVAL,
+                 stall_threshold=constants.WATCHDOG_STALL_THRESHOLD,
+                 heartbeat_timeout=constants.WATCHDOG_HEARTBEAT_TIMEOUT,
+                 heartbeat_path=None, clock=time.monotonic):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.heartbeat_timeout = heartbeat_timeout
+        self.heartbeat_path = heartbeat_path
+        self.clock = clock
+        self.started = clock()
+        self.loop_tick = None
+        self.loop_lag = 0.0
+        self.scheduler_lag = 0.0
+        self.last_beat = None
+        self.polls = 0
+        self._in_flight = {}
+        self._dumped = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll_started(self, key):
+        """Запрос подписки к API начался: с этого момента идёт отсчёт
+        зависания. Ожидание своей очереди в пуле зависанием не считается.
+        """
+        self._in_flight[key] = self.clock()
+
+    def poll_finished(self, key):
+        """Запрос подписки к API завершился."""
+        self._in_flight.pop(key, None)
+
+    def dispatched(self, lag):
+        """Опросы запущены на lag секунд позже срока."""
+        self.scheduler_lag = lag
+        metrics.SCHEDULER_LAG.observe(lag)
+
+    def beat(self, key):
+        """Опрос подписки завершён."""
+        self._in_flight.pop(key, None)
+        self.last_beat = self.clock()
+        self.polls += 1
+
+    async def monitor(self):
+        """Замер задержки цикла событий до отмены."""
+        while True:
+            scheduled = self.clock()
+            self.loop_tick = scheduled
+            await asyncio.sleep(self.interval)
+            self.loop_lag = max(0.0, self.clock() - scheduled - self.interval)
+            self.loop_tick = self.clock()
+            metrics.LOOP_LAG.observe(self.loop_lag)
+
+    def status(self):
+        """Состояние для /healthz, /readyz и файла heartbeat."""
+        now = self.clock()
+        loop_age = now - (self.loop_tick or self.started)
+        # Опросы отмечаются из цикла событий, а читаются из потока
+        # watchdog: берём копию.
+        oldest = min(list(self._in_flight.values()), default=None)
+        poll_age = 0.0 if oldest is None else now - oldest
+        beat_age = now - (self.last_beat or self.started)
+        alive = (loop_age <= self.interval + self.stall_threshold
+                 and poll_age <= self.stall_threshold)
+        return {
+            'alive': alive,
+            'ready': alive and beat_age <= self.heartbeat_timeout,
+            'loop_lag': round(self.loop_lag, 6),
+            'scheduler_lag': round(self.scheduler_lag, 3),
+            'loop_age': round(loop_age, 3),
+            'oldest_poll_age': round(poll_age, 3),
+            'heartbeat_age': round(beat_age, 3),
+            'polls': self.polls,
+        }
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name='watchdog', daemon=True
+        )
+        self._thread.start()
+        metrics.HEARTBEAT_AGE.set_function(
+            lambda: self.status()['heartbeat_age']
+        )
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self):
+        """Проверка из потока watchdog; возвращает состояние."""
+        status = self.status()
+        if not status['alive']:
+            if not self._dumped:
+                self._dumped = True
+                logger.critical(
+                    'Процесс завис: цикл событий отвечал %.0f с назад, '
+                    'самый долгий опрос идёт %.0f с\n%s',
+                    status['loop_age'], status['oldest_poll_age'],
+                    format_stacks(),
+                )
+            return status
+        if self._dumped:
+            self._dumped = False
+            logger.warning('Процесс снова отвечает')
+        if self.heartbeat_path:
+            self._write_heartbeat(status)
+        return status
+
+    def _write_heartbeat(self, status):
+        """Файл обновляется атомарно; его возраст — признак живости."""
+        temporary = f'{self.heartbeat_path}.tmp'
+        try:
+            with open(temporary, 'w', encoding='utf-8') as file:
+                json.dump(dict(status, time=time.time()), file)
+            os.replace(temporary, self.heartbeat_path)
+        except OSError as error:
+            logger.error('Не удалось записать heartbeat: %s', error)
@@ -0,0 +1,95 @@
+import atexit
+import contextvars
+import json
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+import constants
+import metrics
+
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(message)s - строка %(lineno)s'
+
+# Подписка и номер запроса текущего цикла опроса. Переменная контекста
+# копируется в потоки пула, поэтому поля есть и у логов сетевых вызовов.
+log_context = contextvars.ContextVar('log_context', default={})
+
+
+class ContextFilter(logging.Filter):
+    """Добавляет к записи поля tenant и request из log_context."""
+
+    def filter(self, record):
+        context = log_context.get()
+        record.tenant = context.get('tenant')
+        record.request = context.get('request')
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись лога — одна строка JSON."""
+
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'line': record.lineno,
+        }
+        for field in ('tenant', 'request'):
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Кладёт запись в очередь, не форматируя её в вызывающем потоке.
+    Форматирование и вывод выполняет фоновый QueueListener.
+    Если очередь переполнена, запись отбрасывается, а не блокирует опрос;
+    отброшенные считаются в dropped и метрике LOG_DROPPED.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            metrics.LOG_DROPPED.inc()
+
+
+def setup_logging(json_format=False, level=logging.INFO,
+                  queue_size=constants.LOG_QUEUE_SIZE):
+    """Настройка корневого логгера: очередь и фоновый вывод в stdout.
+    Возвращает запущенный QueueListener.
+    """
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(
+        JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    )
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for old_handler in root.handlers[:]:
+        if isinstance(old_handler, NonBlockingQueueHandler):
+            root.removeHandler(old_handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
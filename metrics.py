@@ -0,0 +1,271 @@
+import bisect
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import constants
+
+
+logger = logging.getLogger(__name__)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        f'{name}="{value}"' for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+class Counter:
+    """Монотонно растущий счётчик."""
+
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name, labels):
+        yield f'{name}{labels} {self.value}'
+
+
+class Gauge:
+    """Текущее значение; может вычисляться функцией в момент сбора."""
+
+    __slots__ = ('value', 'function')
+
+    def __init__(self):
+        self.value = 0
+        self.function = None
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        self.function = function
+
+    def samples(self, name, labels):
+        value = self.function() if self.function else self.value
+        yield f'{name}{labels} {value}'
+
+
+class Histogram:
+    """Распределение значений по фиксированным корзинам."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets=constants.METRICS_LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def samples(self, name, labels):
+        # Метка le добавляется к остальным меткам семейства.
+        prefix = labels[:-1] + ',' if labels else '{'
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{prefix}le="{bound}"}} {cumulative}'
+        yield f'{name}_sum{labels} {self.sum}'
+        yield f'{name}_count{labels} {self.count}'
+
+
+class MetricFamily:
+    """Метрика одного типа с набором меток."""
+
+    def __init__(self, name, documentation, kind, factory, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = factory()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._factory())
+        return child
+
+    def __getattr__(self, name):
+        # Метрика без меток ведёт себя как единственный дочерний элемент.
+        if name.startswith('_') or self.labelnames:
+            raise AttributeError(name)
+        return getattr(self._children[()], name)
+
+    def render(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} {self.kind}'
+        for values, child in list(self._children.items()):
+            labels = _format_labels(self.labelnames, values)
+            yield from child.samples(self.name, labels)
+
+
+class Registry:
+    """Набор метрик и их вывод в текстовом формате Prometheus."""
+
+    def __init__(self):
+        self._families = {}
+
+    def _register(self, family):
+        return self._families.setdefault(family.name, family)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(
+            MetricFamily(name, documentation, 'counter', Counter, labelnames)
+        )
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(
+            MetricFamily(name, documentation, 'gauge', Gauge, labelnames)
+        )
+
+    def histogram(self, name, documentation, labelnames=()):
+        return self._register(MetricFamily(
+            name, documentation, 'histogram', Histogram, labelnames
+        ))
+
+    def render(self):
+        lines = []
+        for family in list(self._families.values()):
+            lines.extend(family.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_LATENCY = REGISTRY.histogram(
+    'homework_bot_stage_duration_seconds',
+    'Длительность этапов опроса и доставки.',
+    ('stage',),
+)
+STAGE_ERRORS = REGISTRY.counter(
+    'homework_bot_stage_errors_total',
+    'Число ошибок на этапах опроса и доставки.',
+    ('stage',),
+)
+POLL_TO_NOTIFY = REGISTRY.histogram(
+    'homework_bot_poll_to_notify_seconds',
+    'Время от начала опроса до доставки всех уведомлений.',
+)
+TENANTS = REGISTRY.gauge(
+    'homework_bot_tenants', 'Число опрашиваемых подписок.'
+)
+BREAKER_STATE = REGISTRY.gauge(
+    'homework_bot_breaker_state',
+    'Состояние предохранителя API: 0 — закрыт, 1 — проба, 2 — открыт.',
+)
+DELIVERY_QUEUE_DEPTH = REGISTRY.gauge(
+    'homework_bot_delivery_queue_depth', 'Сообщений в очереди доставки.'
+)
+DELIVERY_SENT = REGISTRY.counter(
+    'homework_bot_delivery_sent_total', 'Отправлено сообщений.'
+)
+DELIVERY_FAILED = REGISTRY.counter(
+    'homework_bot_delivery_failed_total',
+    'Сообщений, которые не удалось отправить.',
+)
+LOG_DROPPED = REGISTRY.counter(
+    'homework_bot_log_dropped_total',
+    'Записей лога, отброшенных при переполнении очереди.',
+)
+LOOP_LAG = REGISTRY.histogram(
+    'homework_bot_loop_lag_seconds',
+    'Задержка цикла событий относительно запланированного пробуждения.',
+)
+SCHEDULER_LAG = REGISTRY.histogram(
+    'homework_bot_scheduler_lag_seconds',
+    'Опоздание запуска опросов относительно их срока.',
+)
+HEARTBEAT_AGE = REGISTRY.gauge(
+    'homework_bot_heartbeat_age_seconds',
+    'Время с завершения последнего опроса.',
+)
+
+
+# Проба -> поле состояния, которое она проверяет.
+PROBES = {'/healthz': 'alive', '/readyz': 'ready'}
+
+
+@contextmanager
+def track(stage):
+    """Замер длительности этапа и подсчёт его ошибок."""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        STAGE_LATENCY.labels(stage).observe(time.perf_counter() - started)
+
+
+def start_http_server(port, host='127.0.0.1', registry=REGISTRY,
+                      health=None):
+    """HTTP-эндпоинт /metrics в фоновом потоке.
+    Метрики собираются только в момент запроса. http.server
+    загружается здесь, чтобы не замедлять импорт без METRICS_PORT.
+    health — функция состояния процесса ({'alive': ..., 'ready': ...}):
+    с ней /healthz и /readyz отвечают 200 или 503.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            path = self.path.split('?')[0]
+            if path == '/metrics':
+                self._reply(
+                    200, self.server.registry.render().encode(),
+                    'text/plain; version=0.0.4',
+                )
+            elif path in PROBES and self.server.health is not None:
+                status = self.server.health()
+                self._reply(
+                    200 if status[PROBES[path]] else 503,
+                    json.dumps(status).encode(), 'application/json',
+                )
+            else:
+                self.send_error(404)
+
+        def _reply(self, code, body, content_type):
+            self.send_response(code)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    server.health = health
+    thread = threading.Thread(
+        target=server.serve_forever, name='metrics', daemon=True
+    )
+    thread.start()
+    logger.info('Метрики доступны на http://%s:%s/metrics', host, port)
+    return server
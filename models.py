@@ -0,0 +1,56 @@
+import sys
+
+import exceptions
+
+
+class Homework:
+    """Компактная запись о домашней работе.
+    Создаётся один раз при разборе ответа API вместо словаря:
+    слоты вместо __dict__, а статус интернирован, так что у тысяч
+    записей одна и та же строка 'approved'.
+    """
+
+    __slots__ = ('id', 'name', 'status', 'date_updated')
+
+    def __init__(self, id, name, status, date_updated=None):
+        self.id = id
+        self.name = name
+        self.status = sys.intern(status)
+        self.date_updated = date_updated
+
+    @classmethod
+    def from_dict(cls, data):
+        """Запись из словаря ответа API с проверкой ключей."""
+        if 'homework_name' not in data:
+            raise KeyError('Отсутствует ключ "homework_name" в ответе API')
+        if 'status' not in data:
+            raise Exception('Отсутствует ключ "status" в ответе API')
+        if not isinstance(data['status'], str):
+            # sys.intern() принимает только строки.
+            raise exceptions.UnknownHWStatusException(
+                'Недокументированный статус домашней работы'
+            )
+        return cls(
+            data.get('id'),
+            data['homework_name'],
+            data['status'],
+            data.get('date_updated'),
+        )
+
+    @property
+    def key(self):
+        """Ключ работы в индексе: id, а при его отсутствии — название."""
+        if self.id is not None:
+            return str(self.id)
+        return self.name
+
+    def __eq__(self, other):
+        if not isinstance(other, Homework):
+            return NotImplemented
+        return (self.id, self.name, self.status, self.date_updated) == (
+            other.id, other.name, other.status, other.date_updated
+        )
+
+    def __repr__(self):
+        return (f'Homework(id={self.id!r}, name={self.name!r}, '
+                f'status={self.status!r})')
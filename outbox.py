@@ -0,0 +1,196 @@
+import asyncio
+import logging
+
+import constants
+import exceptions
+import metrics
+from clock import SYSTEM_CLOCK
+
+
+logger = logging.getLogger(__name__)
+
+
+def notification_key(tenant, homework, chat_id):
+    """Ключ идемпотентности: одна смена статуса — одно сообщение в чат."""
+    return (f'{tenant}:{homework.key}:{homework.status}:'
+            f'{homework.date_updated}:{chat_id}')
+
+
+class Outbox:
+    """Постоянная очередь уведомлений в Storage.
+    Опрос записывает смену статуса и уведомления о ней одной
+    транзакцией и сразу идёт дальше, а run() отправляет их через
+    DeliveryQueue с повторами и отмечает отправленные. После
+    перезапуска неотправленное уходит, а отправленное не повторяется.
+    Взятое в работу уведомление отмечается как начатое только перед
+    самой отправкой: ожидавшие в очереди доставки после падения
+    отправляются снова. Сообщение, отправка которого шла в момент
+    падения, не повторяется: дошло ли оно, узнать нельзя (состояние
+    'uncertain'). Пока процесс жив, срок взятых им уведомлений
+    продлевается, и другая реплика их не перехватит.
+    SQLite вызывается в пуле потоков, чтобы запись (с ожиданием
+    блокировки до Storage.BUSY_TIMEOUT) не останавливала цикл событий.
+    Если чат недоступен боту, уведомление сразу помечается 'failed'.
+    """
+
+    def __init__(self, storage, delivery, clock=SYSTEM_CLOCK,
+                 batch=constants.OUTBOX_BATCH,
+                 retry_base=constants.OUTBOX_RETRY_BASE,
+                 retry_max=constants.OUTBOX_RETRY_MAX,
+                 max_attempts=constants.OUTBOX_MAX_ATTEMPTS,
+                 claim_ttl=constants.OUTBOX_CLAIM_TTL,
+                 retention=constants.OUTBOX_RETENTION):
+        self.storage = storage
+        self.delivery = delivery
+        self.clock = clock
+        self.batch = batch
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.max_attempts = max_attempts
+        self.claim_ttl = claim_ttl
+        self.retention = retention
+        # Задача отправки -> ключ уведомления.
+        self._sending = {}
+        self._wakeup = None
+        self._maintained_at = None
+
+    async def enqueue(self, tenant, changed, messages):
+        """Записывает статусы работ и уведомления во все чаты подписки."""
+        await self._run(
+            self.storage.enqueue_notifications,
+            tenant.id,
+            [(homework.key, homework.status) for homework in changed],
+            [
+                (notification_key(tenant.id, homework, chat_id), chat_id,
+                 message)
+                for homework, message in zip(changed, messages)
+                for chat_id in tenant.chat_ids
+            ],
+            self.clock.time(),
+        )
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def run(self):
+        """Отправка уведомлений до отмены."""
+        loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                self._wakeup.clear()
+                await self._maintain()
+                room = self.batch - len(self._sending)
+                if room > 0:
+                    now = self.clock.time()
+                    for row in await self._run(
+                        self.storage.claim_notifications,
+                        now, room, now + self.claim_ttl,
+                    ):
+                        task = asyncio.create_task(self._send(*row))
+                        self._sending[task] = row[0]
+                        task.add_done_callback(self._sent)
+                    if len(self._sending) >= self.batch:
+                        await self._wakeup.wait()
+                        continue
+                due = await self._run(self.storage.next_notification_due)
+                maintain_at = self._maintained_at + self.claim_ttl / 2
+                if due is None or due > maintain_at:
+                    due = maintain_at
+                timer = loop.call_later(
+                    max(0, due - self.clock.time()), self._wakeup.set
+                )
+                try:
+                    await self._wakeup.wait()
+                finally:
+                    timer.cancel()
+        finally:
+            for task in list(self._sending):
+                task.cancel()
+            await asyncio.gather(*self._sending, return_exceptions=True)
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            None, func, *args
+        )
+
+    def _sent(self, task):
+        self._sending.pop(task, None)
+        self._wakeup.set()
+
+    async def _send(self, key, chat_id, text, attempts, created):
+        started = []
+
+        async def on_start():
+            if not started:
+                # Отметка до записи: если остановка прервёт её, отправка
+                # всё равно считается начатой и повтор не запишется.
+                started.append(True)
+                await self._run(self.storage.start_notification, key)
+
+        try:
+            await self.delivery.deliver(chat_id, text, on_start=on_start)
+        except asyncio.CancelledError:
+            # Остановка: если отправка ещё не началась, сообщение уйдёт
+            # после перезапуска, иначе станет 'uncertain'.
+            if not started:
+                await self._run(
+                    self.storage.retry_notification,
+                    key, attempts, self.clock.time(),
+                )
+            raise
+        except Exception as error:
+            attempts += 1
+            # Недоступный чат повтор не исправит.
+            permanent = isinstance(
+                error, exceptions.ChatUnavailableException
+            )
+            failed = permanent or attempts >= self.max_attempts
+            delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1))
+            await self._run(
+                self.storage.retry_notification,
+                key, attempts, self.clock.time() + delay, failed,
+            )
+            if permanent:
+                logger.error('Уведомление не доставлено: %s', error)
+            elif failed:
+                logger.error(
+                    'Уведомление не доставлено после %s попыток: %s',
+                    attempts, error,
+                )
+            else:
+                logger.warning(
+                    'Ошибка отправки уведомления, повтор через %.0f с: %s',
+                    delay, error,
+                )
+            return
+        await self._run(self.storage.complete_notification, key)
+        metrics.POLL_TO_NOTIFY.observe(max(0.0, self.clock.time() - created))
+
+    async def _maintain(self):
+        """Раз в claim_ttl / 2 (чтобы продлить свои уведомления до
+        истечения срока): брошенные отправки и старые записи.
+        """
+        now = self.clock.time()
+        if (self._maintained_at is not None
+                and now - self._maintained_at < self.claim_ttl / 2):
+            return
+        self._maintained_at = now
+        if self._sending:
+            await self._run(
+                self.storage.extend_notifications,
+                list(self._sending.values()), now + self.claim_ttl,
+            )
+        returned, uncertain = await self._run(
+            self.storage.recover_notifications, now
+        )
+        if returned:
+            logger.warning(
+                'Уведомления упавшего процесса снова в очереди: %s', returned
+            )
+        if uncertain:
+            logger.warning(
+                'Отправка прервана падением, не повторяются: %s', uncertain
+            )
+        await self._run(
+            self.storage.purge_notifications, now - self.retention
+        )
@@ -0,0 +1,158 @@
+import collections
+import logging
+import os
+import re
+import signal
+import sys
+import threading
+import time
+
+import constants
+
+
+logger = logging.getLogger(__name__)
+
+
+def _thread_group(name):
+    """Имя потока без номера: poll_3 -> poll, как корень стека."""
+    return re.sub(r'[_-]\d+$', '', name)
+
+
+class StackSampler:
+    """Выборочный профилировщик стеков всех потоков.
+    Раз в interval секунд снимает стеки через sys._current_frames()
+    и считает одинаковые; результат — свёрнутые стеки (collapsed,
+    формат flamegraph.pl и speedscope). Замер по настенному времени:
+    ожидающие потоки тоже попадают в выборку.
+    """
+
+    def __init__(self, interval=constants.PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name='profiler', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {
+                thread.ident: thread.name for thread in threading.enumerate()
+            }
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    filename = os.path.basename(code.co_filename)
+                    stack.append(
+                        f'{code.co_name} ({filename}:{code.co_firstlineno})'
+                    )
+                    frame = frame.f_back
+                stack.append(_thread_group(names.get(ident, str(ident))))
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f'{stack} {count}\n')
+
+
+class Profiler:
+    """Профилирование по сигналу в работающем процессе.
+    toggle_cpu() (SIGUSR1) включает cProfile в потоке цикла событий
+    и выборку стеков всех потоков (пул опроса, доставка); повторный
+    вызов сохраняет профиль в файлы .pstats и .collapsed.
+    toggle_memory() (SIGUSR2) включает tracemalloc; повторный вызов
+    сохраняет снимок (.tracemalloc) и пишет в лог самый большой рост
+    памяти. Пока профилирование выключено, накладных расходов нет.
+    """
+
+    def __init__(self, directory=constants.PROFILE_DIR, prefix='profile',
+                 sample_interval=constants.PROFILE_SAMPLE_INTERVAL,
+                 memory_frames=constants.TRACEMALLOC_FRAMES):
+        self.directory = directory
+        self.prefix = prefix
+        self.sample_interval = sample_interval
+        self.memory_frames = memory_frames
+        self._cpu = None
+        self._sampler = None
+        self._cpu_started = None
+        self._baseline = None
+
+    def install(self, loop):
+        """Обработчики SIGUSR1 и SIGUSR2 в цикле событий."""
+        loop.add_signal_handler(signal.SIGUSR1, self.toggle_cpu)
+        loop.add_signal_handler(signal.SIGUSR2, self.toggle_memory)
+
+    def _path(self, kind, extension):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        return os.path.join(
+            self.directory,
+            f'{self.prefix}-{kind}-{stamp}-{os.getpid()}.{extension}',
+        )
+
+    def toggle_cpu(self):
+        """Включает или выключает профилирование процессора.
+        Возвращает пути сохранённых файлов при выключении.
+        """
+        if self._cpu is None:
+            import cProfile
+            self._cpu = cProfile.Profile()
+            self._sampler = StackSampler(self.sample_interval)
+            self._cpu_started = time.monotonic()
+            self._sampler.start()
+            self._cpu.enable()
+            logger.warning('Профилирование процессора включено')
+            return None
+        self._cpu.disable()
+        self._sampler.stop()
+        pstats_path = self._path('cpu', 'pstats')
+        collapsed_path = self._path('cpu', 'collapsed')
+        self._cpu.dump_stats(pstats_path)
+        self._sampler.write(collapsed_path)
+        logger.warning(
+            'Профиль за %.0f с (%s выборок): %s, %s',
+            time.monotonic() - self._cpu_started, self._sampler.samples,
+            pstats_path, collapsed_path,
+        )
+        self._cpu = self._sampler = None
+        return pstats_path, collapsed_path
+
+    def toggle_memory(self):
+        """Включает или выключает tracemalloc.
+        Возвращает путь снимка при выключении.
+        """
+        import tracemalloc
+        if self._baseline is None:
+            tracemalloc.start(self.memory_frames)
+            self._baseline = tracemalloc.take_snapshot()
+            logger.warning('Трассировка памяти включена')
+            return None
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+        ))
+        tracemalloc.stop()
+        path = self._path('memory', 'tracemalloc')
+        snapshot.dump(path)
+        top = snapshot.compare_to(self._baseline, 'lineno')[:10]
+        self._baseline = None
+        logger.warning(
+            'Снимок памяти: %s; наибольший рост:\n%s',
+            path, '\n'.join(str(stat) for stat in top),
+        )
+        return path
@@ -0,0 +1,70 @@
+import heapq
+import itertools
+
+
+class DeadlineScheduler:
+    """Очередь подписок по времени следующего опроса (min-куча).
+    Перепланирование — O(log n): старая запись помечается
+    недействительной и выбрасывается, когда доходит до вершины кучи.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._entries = {}
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def schedule(self, key, due):
+        """Назначает (или переносит) опрос подписки key на время due."""
+        old = self._entries.get(key)
+        if old is not None:
+            old[-1] = False
+        entry = [due, next(self._counter), key, True]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+        # Не даём куче разрастаться из-за устаревших записей.
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._compact()
+
+    def due(self, key):
+        """Срок опроса подписки key или None, если его нет в очереди."""
+        entry = self._entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry[-1] = False
+
+    def next_due(self):
+        """Время ближайшего опроса или None, если очередь пуста."""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now, limit=None):
+        """Извлекает подписки, время опроса которых наступило
+        (не больше limit, если он задан).
+        """
+        due = []
+        while limit is None or len(due) < limit:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                return due
+            entry = heapq.heappop(self._heap)
+            del self._entries[entry[2]]
+            due.append(entry[2])
+        return due
+
+    def _drop_stale(self):
+        heap = self._heap
+        while heap and not heap[0][-1]:
+            heapq.heappop(heap)
+
+    def _compact(self):
+        self._heap = [entry for entry in self._heap if entry[-1]]
+        heapq.heapify(self._heap)
@@ -0,0 +1,68 @@
+import sys
+
+
+class StatusIndex:
+    """Последний известный статус каждой работы каждой подписки.
+    Индекс хранится в памяти и дублируется в Storage, чтобы
+    после перезапуска не присылать уже известные статусы повторно.
+    Записи Homework в индексе не хранятся: для сравнения достаточно
+    ключа работы и интернированной строки статуса.
+    """
+
+    def __init__(self, storage=None, tenants=None):
+        self.storage = storage
+        self._statuses = storage.load_statuses() if storage else {}
+        if tenants is not None:
+            # Шард держит в памяти только статусы своих подписок.
+            self._statuses = {
+                tenant: statuses
+                for tenant, statuses in self._statuses.items()
+                if tenant in tenants
+            }
+        for statuses in self._statuses.values():
+            _intern(statuses)
+
+    def load(self, tenant):
+        """Перечитывает статусы подписки из хранилища."""
+        if self.storage:
+            self._statuses[tenant] = _intern(
+                self.storage.load_tenant_statuses(tenant)
+            )
+
+    def forget(self, tenant):
+        """Убирает подписку из памяти; в хранилище статусы остаются."""
+        self._statuses.pop(tenant, None)
+
+    def get(self, tenant, key):
+        """Последний известный статус работы или None."""
+        return self._statuses.get(tenant, {}).get(key)
+
+    def statuses(self, tenant):
+        """Известные статусы работ подписки."""
+        return self._statuses.get(tenant, {}).values()
+
+    def diff(self, tenant, homeworks):
+        """Работы из ответа API, статус которых изменился.
+        Ответ (записи Homework) просматривается за один проход.
+        """
+        known = self._statuses.get(tenant, {})
+        changed = []
+        for homework in homeworks:
+            if known.get(homework.key) != homework.status:
+                changed.append(homework)
+        return changed
+
+    def update(self, tenant, homework, persist=True):
+        """Запоминает статус работы после отправки уведомления.
+        persist=False — статус уже записан в хранилище вызывающим.
+        """
+        key = homework.key
+        self._statuses.setdefault(tenant, {})[key] = homework.status
+        if self.storage and persist:
+            self.storage.save_status(tenant, key, homework.status)
+
+
+def _intern(statuses):
+    for key, status in statuses.items():
+        statuses[key] = sys.intern(status)
+    return statuses
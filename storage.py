@@ -0,0 +1,332 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class Storage:
+    """Постоянное хранилище состояния бота в SQLite.
+    База работает в режиме WAL: запись курсора не блокирует чтение,
+    а после перезапуска опрос продолжается с сохранённого места.
+    """
+
+    # Базу могут делить несколько процессов-шардов: ждём снятия
+    # блокировки записи, а не падаем сразу с "database is locked".
+    BUSY_TIMEOUT = 30
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False,
+            timeout=self.BUSY_TIMEOUT,
+        )
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS cursors ('
+            'tenant TEXT PRIMARY KEY, '
+            'from_date INTEGER NOT NULL)'
+        )
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS statuses ('
+            'tenant TEXT NOT NULL, '
+            'homework TEXT NOT NULL, '
+            'status TEXT NOT NULL, '
+            'PRIMARY KEY (tenant, homework))'
+        )
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS leases ('
+            'tenant TEXT PRIMARY KEY, '
+            'owner TEXT NOT NULL, '
+            'expires REAL NOT NULL, '
+            'due REAL)'
+        )
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS replicas ('
+            'owner TEXT PRIMARY KEY, '
+            'scope TEXT NOT NULL, '
+            'expires REAL NOT NULL)'
+        )
+        # chat_id без типа: id чата хранится так, как задан (число
+        # или строка).
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS outbox ('
+            'key TEXT PRIMARY KEY, '
+            'tenant TEXT NOT NULL, '
+            'chat_id NOT NULL, '
+            'text TEXT NOT NULL, '
+            "state TEXT NOT NULL DEFAULT 'pending', "
+            'attempts INTEGER NOT NULL DEFAULT 0, '
+            'next_attempt REAL NOT NULL, '
+            'created REAL NOT NULL)'
+        )
+        self._connection.execute(
+            'CREATE INDEX IF NOT EXISTS outbox_due '
+            'ON outbox (state, next_attempt)'
+        )
+
+    def load_cursors(self):
+        """Словарь {подписка: current_date} для всех подписок."""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT tenant, from_date FROM cursors'
+            ).fetchall()
+        return dict(rows)
+
+    def load_cursor(self, tenant):
+        """current_date одной подписки или None."""
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT from_date FROM cursors WHERE tenant = ?', (tenant,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def save_cursor(self, tenant, current_date):
+        """Сохранение последнего current_date подписки."""
+        with self._lock:
+            self._connection.execute(
+                'INSERT INTO cursors (tenant, from_date) VALUES (?, ?) '
+                'ON CONFLICT(tenant) DO UPDATE '
+                'SET from_date = excluded.from_date',
+                (tenant, current_date),
+            )
+
+    def load_statuses(self):
+        """Последние известные статусы: {подписка: {работа: статус}}."""
+        statuses = {}
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT tenant, homework, status FROM statuses'
+            ).fetchall()
+        for tenant, homework, status in rows:
+            statuses.setdefault(tenant, {})[homework] = status
+        return statuses
+
+    def load_tenant_statuses(self, tenant):
+        """Последние известные статусы работ одной подписки."""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT homework, status FROM statuses WHERE tenant = ?',
+                (tenant,),
+            ).fetchall()
+        return dict(rows)
+
+    def save_status(self, tenant, homework, status):
+        """Сохранение статуса одной работы подписки."""
+        with self._lock:
+            self._connection.execute(
+                'INSERT INTO statuses (tenant, homework, status) '
+                'VALUES (?, ?, ?) '
+                'ON CONFLICT(tenant, homework) DO UPDATE '
+                'SET status = excluded.status',
+                (tenant, homework, status),
+            )
+
+    def heartbeat(self, owner, scope, expires, now):
+        """Отметка живой реплики.
+        Возвращает число живых реплик с тем же набором подписок scope.
+        """
+        with self._transaction() as connection:
+            connection.execute(
+                'INSERT INTO replicas (owner, scope, expires) '
+                'VALUES (?, ?, ?) '
+                'ON CONFLICT(owner) DO UPDATE '
+                'SET scope = excluded.scope, expires = excluded.expires',
+                (owner, scope, expires),
+            )
+            connection.execute(
+                'DELETE FROM replicas WHERE expires < ?', (now,)
+            )
+            return connection.execute(
+                'SELECT COUNT(*) FROM replicas WHERE scope = ?', (scope,)
+            ).fetchone()[0]
+
+    def held_leases(self, now):
+        """Подписки с действующей арендой: {подписка: владелец}."""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT tenant, owner FROM leases WHERE expires >= ?', (now,)
+            ).fetchall()
+        return dict(rows)
+
+    def renew_leases(self, owner, expires, dues):
+        """Продление аренды своих подписок.
+        dues — {подписка: срок следующего опроса или None}.
+        Возвращает подписки, которые по-прежнему за владельцем.
+        """
+        with self._transaction() as connection:
+            connection.executemany(
+                'UPDATE leases SET expires = ?, due = COALESCE(?, due) '
+                'WHERE tenant = ? AND owner = ?',
+                [(expires, due, tenant, owner)
+                 for tenant, due in dues.items()],
+            )
+            rows = connection.execute(
+                'SELECT tenant FROM leases WHERE owner = ?', (owner,)
+            ).fetchall()
+        return {tenant for tenant, in rows}
+
+    def claim_leases(self, owner, tenants, expires, now):
+        """Захват свободных или просроченных подписок.
+        Возвращает {подписка: срок опроса, оставленный прежним владельцем}.
+        """
+        claimed = {}
+        with self._transaction() as connection:
+            for tenant in tenants:
+                cursor = connection.execute(
+                    'INSERT INTO leases (tenant, owner, expires) '
+                    'VALUES (?, ?, ?) '
+                    'ON CONFLICT(tenant) DO UPDATE '
+                    'SET owner = excluded.owner, expires = excluded.expires '
+                    'WHERE leases.expires < ?',
+                    (tenant, owner, expires, now),
+                )
+                if cursor.rowcount:
+                    claimed[tenant] = connection.execute(
+                        'SELECT due FROM leases WHERE tenant = ?', (tenant,)
+                    ).fetchone()[0]
+        return claimed
+
+    def release_leases(self, owner, dues):
+        """Освобождение аренды; срок опроса остаётся следующему владельцу."""
+        with self._transaction() as connection:
+            connection.executemany(
+                "UPDATE leases SET owner = '', expires = 0, "
+                'due = COALESCE(?, due) WHERE tenant = ? AND owner = ?',
+                [(due, tenant, owner) for tenant, due in dues.items()],
+            )
+
+    def remove_replica(self, owner):
+        with self._lock:
+            self._connection.execute(
+                'DELETE FROM replicas WHERE owner = ?', (owner,)
+            )
+
+    def enqueue_notifications(self, tenant, statuses, notifications, now):
+        """Статусы работ и уведомления о них одной транзакцией.
+        statuses — [(работа, статус)], notifications — [(ключ
+        идемпотентности, чат, текст)]. Уведомление с уже известным
+        ключом повторно не ставится.
+        """
+        with self._transaction() as connection:
+            connection.executemany(
+                'INSERT INTO statuses (tenant, homework, status) '
+                'VALUES (?, ?, ?) '
+                'ON CONFLICT(tenant, homework) DO UPDATE '
+                'SET status = excluded.status',
+                [(tenant, homework, status) for homework, status in statuses],
+            )
+            connection.executemany(
+                'INSERT OR IGNORE INTO outbox '
+                '(key, tenant, chat_id, text, next_attempt, created) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(key, tenant, chat_id, text, now, now)
+                 for key, chat_id, text in notifications],
+            )
+
+    def claim_notifications(self, now, limit, claim_until):
+        """Забирает до limit уведомлений, срок отправки которых наступил.
+        Они помечаются 'claimed' до claim_until: взяты в очередь доставки,
+        но отправка ещё не началась.
+        Возвращает [(ключ, чат, текст, попыток, создано)].
+        """
+        with self._transaction() as connection:
+            rows = connection.execute(
+                'SELECT key, chat_id, text, attempts, created FROM outbox '
+                "WHERE state = 'pending' AND next_attempt <= ? "
+                'ORDER BY next_attempt LIMIT ?',
+                (now, limit),
+            ).fetchall()
+            connection.executemany(
+                "UPDATE outbox SET state = 'claimed', next_attempt = ? "
+                'WHERE key = ?',
+                [(claim_until, row[0]) for row in rows],
+            )
+        return rows
+
+    def start_notification(self, key):
+        """Отправка началась: после падения её уже нельзя повторять."""
+        with self._lock:
+            self._connection.execute(
+                "UPDATE outbox SET state = 'sending' WHERE key = ?", (key,)
+            )
+
+    def extend_notifications(self, keys, claim_until):
+        """Продлевает срок уведомлений, которые ещё в работе у процесса."""
+        with self._lock:
+            self._connection.executemany(
+                'UPDATE outbox SET next_attempt = ? '
+                "WHERE key = ? AND state IN ('claimed', 'sending')",
+                [(claim_until, key) for key in keys],
+            )
+
+    def complete_notification(self, key):
+        with self._lock:
+            self._connection.execute(
+                "UPDATE outbox SET state = 'sent' WHERE key = ?", (key,)
+            )
+
+    def retry_notification(self, key, attempts, next_attempt, failed=False):
+        """Неудачная попытка: новая попытка в next_attempt или отказ."""
+        with self._lock:
+            self._connection.execute(
+                'UPDATE outbox SET state = ?, attempts = ?, next_attempt = ? '
+                'WHERE key = ?',
+                ('failed' if failed else 'pending', attempts, next_attempt,
+                 key),
+            )
+
+    def recover_notifications(self, now):
+        """Уведомления, брошенные упавшим процессом к сроку.
+        Взятые в очередь, но не начатые ('claimed') снова ставятся
+        в очередь. Если же процесс упал во время запроса к Telegram
+        ('sending'), дошло ли сообщение, узнать нельзя: такие
+        помечаются 'uncertain' и не повторяются.
+        Возвращает (число возвращённых в очередь, число 'uncertain').
+        """
+        with self._transaction() as connection:
+            returned = connection.execute(
+                "UPDATE outbox SET state = 'pending' "
+                "WHERE state = 'claimed' AND next_attempt < ?",
+                (now,),
+            ).rowcount
+            uncertain = connection.execute(
+                "UPDATE outbox SET state = 'uncertain' "
+                "WHERE state = 'sending' AND next_attempt < ?",
+                (now,),
+            ).rowcount
+        return returned, uncertain
+
+    def next_notification_due(self):
+        """Ближайший срок отправки или None, если очередь пуста."""
+        with self._lock:
+            return self._connection.execute(
+                'SELECT MIN(next_attempt) FROM outbox '
+                "WHERE state = 'pending'"
+            ).fetchone()[0]
+
+    def purge_notifications(self, before):
+        """Удаляет отправленные уведомления, созданные раньше before."""
+        with self._lock:
+            return self._connection.execute(
+                "DELETE FROM outbox WHERE state = 'sent' AND created < ?",
+                (before,),
+            ).rowcount
+
+    @contextmanager
+    def _transaction(self):
+        """Транзакция с блокировкой записи с самого начала, чтобы
+        проверка и захват аренды не перемежались с другой репликой.
+        """
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._connection
+            except BaseException:
+                self._connection.execute('ROLLBACK')
+                raise
+            self._connection.execute('COMMIT')
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,185 @@
+import codecs
+import json
+from json.decoder import scanstring
+
+import exceptions
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+WHITESPACE = ' \t\n\r'
+
+
+def loads(data):
+    """Разбор JSON целиком: orjson, если установлен, иначе json."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class HomeworkStream:
+    """Потоковый разбор ответа homework_statuses.
+    Читает тело ответа частями и отдаёт работы по одной, не собирая
+    весь ответ в памяти. current_date доступен после полного обхода.
+    Ошибки те же, что у check_response: TypeError, ValueError и
+    CheckResponseException.
+    """
+
+    def __init__(self, chunks, close=None):
+        self._chunks = iter(chunks)
+        self._close = close
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._position = 0
+        self._exhausted = False
+        self._decoder = json.JSONDecoder()
+        self._consumed = False
+        self.current_date = None
+
+    def __iter__(self):
+        if self._consumed:
+            raise RuntimeError('Ответ API уже прочитан')
+        self._consumed = True
+        return self._parse_and_close()
+
+    def _parse_and_close(self):
+        try:
+            yield from self._parse()
+        finally:
+            if self._close is not None:
+                self._close()
+
+    def _read(self):
+        """Дочитывает следующую часть тела; False, если тело кончилось."""
+        if self._exhausted:
+            return False
+        try:
+            for chunk in self._chunks:
+                if isinstance(chunk, bytes):
+                    # Символ UTF-8 может оказаться разрезан между частями.
+                    chunk = self._text.decode(chunk)
+                if not chunk:
+                    continue
+                # Отбрасываем уже разобранную часть буфера.
+                self._buffer = self._buffer[self._position:] + chunk
+                self._position = 0
+                return True
+        except UnicodeDecodeError as error:
+            raise exceptions.CheckResponseException(
+                f'Некорректная кодировка ответа API: {error}'
+            )
+        except OSError as error:
+            # Обрыв соединения при чтении тела ответа.
+            raise ConnectionError(f'Сбой при чтении ответа API: {error}')
+        self._exhausted = True
+        return False
+
+    def _peek(self):
+        """Следующий значащий символ без его извлечения."""
+        while True:
+            while (self._position < len(self._buffer)
+                   and self._buffer[self._position] in WHITESPACE):
+                self._position += 1
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._read():
+                return None
+
+    def _expect(self, *chars):
+        char = self._peek()
+        if char not in chars:
+            raise exceptions.CheckResponseException(
+                f'Некорректный JSON в ответе API: ожидалось {chars}, '
+                f'получено {char!r}'
+            )
+        self._position += 1
+        return char
+
+    def _value(self):
+        """Одно JSON-значение, начиная с текущей позиции."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(
+                    self._buffer, self._position
+                )
+            except json.JSONDecodeError as error:
+                if self._read():
+                    continue
+                raise exceptions.CheckResponseException(
+                    f'Некорректный JSON в ответе API: {error}'
+                )
+            # Число на границе частей может быть прочитано не целиком.
+            if end == len(self._buffer) and self._read():
+                continue
+            self._position = end
+            return value
+
+    def _key(self):
+        self._expect('"')
+        while True:
+            try:
+                key, end = scanstring(self._buffer, self._position)
+            except json.JSONDecodeError as error:
+                if self._read():
+                    continue
+                raise exceptions.CheckResponseException(
+                    f'Некорректный JSON в ответе API: {error}'
+                )
+            self._position = end
+            self._expect(':')
+            return key
+
+    def _parse(self):
+        if self._peek() != '{':
+            self._value()
+            raise TypeError('Ответ от Домашки не словарь')
+        self._position += 1
+        seen = set()
+        if self._peek() == '}':
+            self._position += 1
+        else:
+            while True:
+                key = self._key()
+                seen.add(key)
+                if key == 'homeworks':
+                    yield from self._homeworks()
+                elif key == 'current_date':
+                    self.current_date = self._value()
+                else:
+                    self._value()
+                if self._expect(',', '}') == '}':
+                    break
+        for key in ('current_date', 'homeworks'):
+            if key not in seen:
+                raise exceptions.CheckResponseException(
+                    f'Ошибка доступа по ключу "\'{key}\'"'
+                )
+
+    def _homeworks(self):
+        if self._peek() != '[':
+            self._value()
+            raise ValueError('Тип ключа homeworks не list')
+        self._position += 1
+        if self._peek() == ']':
+            self._position += 1
+            return
+        while True:
+            homework = self._value()
+            if not isinstance(homework, dict):
+                raise exceptions.CheckResponseException(
+                    'Работа в ответе API не словарь'
+                )
+            yield homework
+            if self._expect(',', ']') == ']':
+                return
+
+
+def current_date(response):
+    """current_date из словаря или уже прочитанного потока."""
+    if isinstance(response, HomeworkStream):
+        return response.current_date
+    return response.get('current_date')
@@ -0,0 +1,237 @@
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing.connection import wait
+
+import constants
+from hashring import HashRing
+
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """Процесс-шард и канал управления к нему."""
+
+    __slots__ = ('shard', 'process', 'control', 'started', 'failures',
+                 'restart_at')
+
+    def __init__(self, shard, process, control, failures=0):
+        self.shard = shard
+        self.process = process
+        self.control = control
+        self.started = time.monotonic()
+        self.failures = failures
+        self.restart_at = None
+
+
+class Supervisor:
+    """Надзиратель над K процессами-шардами.
+    Каждый шард вызывает target(shard, shards, control) и опрашивает
+    подписки, которые ему отводит HashRing. Упавший шард перезапускается
+    с экспоненциальной задержкой. SIGTTIN и SIGTTOU добавляют и убирают
+    шард: оставшимся шардам новое число уходит через control, и они
+    перебалансируются на ходу, перенося только затронутые подписки.
+    """
+
+    def __init__(self, target, shards=constants.WORKER_PROCESSES,
+                 restart_base=constants.WORKER_RESTART_BASE,
+                 restart_max=constants.WORKER_RESTART_MAX,
+                 stop_timeout=constants.WORKER_STOP_TIMEOUT,
+                 context=None):
+        if shards < 1:
+            raise ValueError('Число шардов должно быть положительным')
+        self.target = target
+        self.shards = shards
+        self.restart_base = restart_base
+        self.restart_max = restart_max
+        self.stop_timeout = stop_timeout
+        # spawn: шард не наследует потоки и соединения надзирателя.
+        self._context = context or multiprocessing.get_context('spawn')
+        self._workers = {}
+        self._retiring = []
+        self._stopping = False
+        self._resize_to = None
+        # Сигнал лишь пишет байт в pipe, а цикл ждёт его вместе
+        # с процессами, поэтому реагирует сразу, а не по таймауту.
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+        os.set_blocking(self._wakeup_write, False)
+
+    def install_signal_handlers(self):
+        """Обработчики сигналов; вызывается из главного потока."""
+        signal.signal(signal.SIGTERM, lambda *_: self.stop())
+        signal.signal(signal.SIGINT, lambda *_: self.stop())
+        signal.signal(signal.SIGTTIN, lambda *_: self.resize(self.shards + 1))
+        signal.signal(signal.SIGTTOU, lambda *_: self.resize(self.shards - 1))
+        # Профилирование включается в шардах, а не в надзирателе.
+        signal.signal(signal.SIGUSR1, lambda signum, _: self.forward(signum))
+        signal.signal(signal.SIGUSR2, lambda signum, _: self.forward(signum))
+
+    def stop(self):
+        self._stopping = True
+        self._wake()
+
+    def resize(self, shards):
+        """Запрос на смену числа шардов; применяется в цикле run()."""
+        self._resize_to = max(1, shards)
+        self._wake()
+
+    def forward(self, signum):
+        """Пересылает сигнал всем работающим шардам."""
+        for worker in list(self._workers.values()):
+            if worker.restart_at is None and worker.process.pid:
+                try:
+                    os.kill(worker.process.pid, signum)
+                except ProcessLookupError:
+                    pass
+
+    def alive(self):
+        """Номера работающих шардов."""
+        return sorted(
+            shard for shard, worker in self._workers.items()
+            if worker.restart_at is None and worker.process.is_alive()
+        )
+
+    def run(self):
+        """Запуск шардов и надзор за ними до stop()."""
+        logger.info('Запуск шардов: %s', self.shards)
+        for shard in range(self.shards):
+            self._start(shard)
+        try:
+            while not self._stopping:
+                self._wait()
+                if self._resize_to is not None:
+                    self._apply_resize()
+                self._reap()
+                self._restart_due()
+        finally:
+            self._shutdown()
+
+    def _wake(self):
+        try:
+            os.write(self._wakeup_write, b'\0')
+        except BlockingIOError:
+            pass
+
+    def _start(self, shard, failures=0):
+        control, child_control = self._context.Pipe()
+        process = self._context.Process(
+            target=self.target,
+            args=(shard, self.shards, child_control),
+            name=f'shard-{shard}',
+        )
+        process.start()
+        child_control.close()
+        self._workers[shard] = Worker(shard, process, control, failures)
+
+    def _wait(self):
+        running = [
+            worker.process.sentinel
+            for worker in list(self._workers.values()) + self._retiring
+            if worker.restart_at is None
+        ]
+        pending = [
+            worker.restart_at for worker in self._workers.values()
+            if worker.restart_at is not None
+        ]
+        timeout = max(0, min(pending) - time.monotonic()) if pending else None
+        wait(running + [self._wakeup_read], timeout)
+        try:
+            while os.read(self._wakeup_read, 512):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _apply_resize(self):
+        shards, self._resize_to = self._resize_to, None
+        if shards == self.shards:
+            return
+        logger.info('Число шардов: %s -> %s', self.shards, shards)
+        previous, self.shards = self.shards, shards
+        for shard in range(shards, previous):
+            worker = self._workers.pop(shard, None)
+            if worker is not None and worker.restart_at is None:
+                worker.process.terminate()
+                self._retiring.append(worker)
+        for worker in self._workers.values():
+            if worker.restart_at is None:
+                try:
+                    worker.control.send(shards)
+                except OSError:
+                    # Шард уже завершился, его подберёт _reap().
+                    pass
+        for shard in range(previous, shards):
+            self._start(shard)
+
+    def _reap(self):
+        now = time.monotonic()
+        for worker in self._retiring[:]:
+            if not worker.process.is_alive():
+                worker.process.join()
+                worker.control.close()
+                self._retiring.remove(worker)
+        for worker in self._workers.values():
+            if worker.restart_at is not None or worker.process.is_alive():
+                continue
+            worker.process.join()
+            worker.control.close()
+            # Долго проработавший шард перезапускаем без задержки
+            # накопленных ранее сбоев.
+            if now - worker.started > self.restart_max:
+                worker.failures = 0
+            delay = min(
+                self.restart_max, self.restart_base * 2 ** worker.failures
+            )
+            worker.failures += 1
+            worker.restart_at = now + delay
+            logger.error(
+                'Шард %s завершился с кодом %s, перезапуск через %.0f с',
+                worker.shard, worker.process.exitcode, delay,
+            )
+
+    def _restart_due(self):
+        now = time.monotonic()
+        for shard, worker in list(self._workers.items()):
+            if worker.restart_at is not None and worker.restart_at <= now:
+                self._start(shard, worker.failures)
+
+    def _shutdown(self):
+        workers = list(self._workers.values()) + self._retiring
+        for worker in workers:
+            if worker.restart_at is None and worker.process.is_alive():
+                worker.process.terminate()
+        deadline = time.monotonic() + self.stop_timeout
+        for worker in workers:
+            if worker.restart_at is not None:
+                continue
+            worker.process.join(max(0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                logger.warning('Шард %s не остановился, kill', worker.shard)
+                worker.process.kill()
+                worker.process.join()
+            worker.control.close()
+        self._workers.clear()
+        self._retiring.clear()
+        os.close(self._wakeup_read)
+        os.close(self._wakeup_write)
+        logger.info('Шарды остановлены')
+
+
+def rebalance(engine, tenants, shard, shards):
+    """Приводит подписки движка шарда к раскладке для shards шардов.
+    Возвращает число подключённых и отключённых подписок.
+    """
+    ring = HashRing(shards)
+    added = removed = 0
+    for tenant in tenants:
+        owned = ring.owns(shard, tenant.id)
+        if owned and tenant.id not in engine.tenants:
+            engine.add_tenant(tenant)
+            added += 1
+        elif not owned and tenant.id in engine.tenants:
+            engine.remove_tenant(tenant.id)
+            removed += 1
+    return added, removed
@@ -0,0 +1,86 @@
+import hashlib
+import json
+
+
+class Tenant:
+    """Подписка на статусы: токен Практикума и чаты Telegram.
+    Один токен опрашивается один раз, а статусы рассылаются во все
+    его чаты (студент, наставник, групповой чат). Первый чат —
+    владелец токена: туда же уходят уведомления об ошибках опроса.
+    """
+
+    __slots__ = ('id', 'token', 'chat_ids', 'cursor', 'failures')
+
+    def __init__(self, token, chat_id, cursor=None):
+        self.id = tenant_id(token)
+        self.token = token
+        self.chat_ids = ()
+        self.cursor = cursor
+        self.failures = 0
+        if isinstance(chat_id, (list, tuple)):
+            for chat in chat_id:
+                self.subscribe(chat)
+        else:
+            self.subscribe(chat_id)
+
+    @property
+    def chat_id(self):
+        """Чат владельца токена."""
+        return self.chat_ids[0] if self.chat_ids else None
+
+    def subscribe(self, chat_id):
+        """Добавляет чат в рассылку, повторы не дублируются."""
+        if chat_id not in self.chat_ids:
+            self.chat_ids += (chat_id,)
+
+    def __repr__(self):
+        return f'Tenant(id={self.id!r}, chat_ids={self.chat_ids!r})'
+
+
+def tenant_id(token):
+    """Стабильный идентификатор подписки.
+    Токен не попадает в логи, вместо него используется хеш.
+    """
+    return hashlib.sha256(str(token).encode()).hexdigest()[:12]
+
+
+def parse_chat_ids(value):
+    """Чаты из переменной окружения: через запятую."""
+    return [chat.strip() for chat in str(value).split(',') if chat.strip()]
+
+
+def merge_tenants(tenants):
+    """Объединяет подписки с одинаковым токеном в одну с несколькими
+    чатами, чтобы общий токен не опрашивался дважды.
+    """
+    merged = {}
+    for tenant in tenants:
+        existing = merged.get(tenant.id)
+        if existing is None:
+            merged[tenant.id] = tenant
+            continue
+        for chat_id in tenant.chat_ids:
+            existing.subscribe(chat_id)
+    return list(merged.values())
+
+
+def load_tenants(path):
+    """Загрузка списка подписок из JSON-файла.
+    Формат: [{"practicum_token": "...", "chat_id": 123}, ...];
+    вместо chat_id можно указать список "chat_ids". Записи с одним
+    токеном объединяются.
+    """
+    with open(path, encoding='utf-8') as file:
+        data = json.load(file)
+    if not isinstance(data, list):
+        raise TypeError('Файл подписок должен содержать список')
+    tenants = []
+    for number, item in enumerate(data):
+        try:
+            chats = item.get('chat_ids') or item['chat_id']
+            tenants.append(Tenant(item['practicum_token'], chats))
+        except (AttributeError, KeyError, TypeError) as error:
+            raise ValueError(
+                f'Некорректная запись подписки №{number}: {error}'
+            )
+    return merge_tenants(tenants)
@@ -0,0 +1,93 @@
+from collections import Counter
+
+from backoff import PollPolicy, parse_retry_after
+from clock import VirtualClock
+from delivery import DeliveryQueue
+from engine import PollingEngine
+from models import Homework
+from tenants import Tenant
+
+
+class TestPollPolicy:
+
+    def test_backoff_grows_and_is_capped(self):
+        policy = PollPolicy(600, backoff_base=30, backoff_max=240)
+        for failures, limit in [(1, 30), (2, 60), (3, 120), (4, 240),
+                                (10, 240)]:
+            delay = policy.next_delay(failures)
+            assert limit / 2 <= delay <= limit, (
+                'Проверьте экспоненциальный рост задержки после сбоев'
+            )
+
+    def test_backoff_survives_many_failures(self):
+        policy = PollPolicy(600, backoff_base=30.0, backoff_max=3600.0)
+        for failures in (1025, 10 ** 6):
+            delay = policy.next_delay(failures)
+            assert 1800 <= delay <= 3600, (
+                'Проверьте, что задержка после множества сбоев не '
+                'переполняется и равна backoff_max'
+            )
+
+    def test_success_interval_is_jittered(self):
+        policy = PollPolicy(600, jitter=0.1)
+        delays = {policy.next_delay() for _ in range(20)}
+        assert all(540 <= delay <= 660 for delay in delays)
+        assert len(delays) > 1, (
+            'Проверьте, что интервал опроса содержит случайный разброс'
+        )
+
+    def test_retry_after_is_respected(self):
+        policy = PollPolicy(600, backoff_base=1)
+        assert policy.next_delay(1, retry_after=120) >= 120
+        assert parse_retry_after('120') == 120
+        assert parse_retry_after(
+            'Thu, 01 Jan 1970 00:02:00 GMT', now=0
+        ) == 120
+        assert parse_retry_after('мусор') is None
+
+    def test_interval_depends_on_statuses(self):
+        policy = PollPolicy(600, jitter=0)
+        for statuses, expected in [(['reviewing'], 300),
+                                   (['approved'], 1200),
+                                   ((), 600),
+                                   (['approved', 'reviewing'], 300)]:
+            assert policy.next_delay(statuses=statuses) == expected, (
+                'Проверьте, что интервал умножается на коэффициент '
+                'самого частого статуса: reviewing ×0.5, approved ×2, '
+                'без работ ×1'
+            )
+
+
+class TestStatusIntervals:
+
+    def test_reviewing_tenant_is_polled_more_often(self):
+        clock = VirtualClock()
+        calls = Counter()
+        statuses = {'review': 'reviewing', 'done': 'approved'}
+
+        def fetch(token, timestamp):
+            calls[token] += 1
+            return {
+                'homeworks': [Homework(1, 'hw', statuses[token])],
+                'current_date': int(clock.time()),
+            }
+
+        engine = PollingEngine(
+            [Tenant('review', [1]), Tenant('done', [2])],
+            fetch=fetch,
+            check_response=lambda response: response['homeworks'],
+            parse_status=lambda homework: homework.status,
+            delivery=DeliveryQueue(lambda chat_id, message: None,
+                                   clock=clock.monotonic),
+            policy=PollPolicy(600, jitter=0),
+            clock=clock,
+        )
+        clock.run(engine.run(), duration=6 * 3600)
+        assert 70 <= calls['review'] <= 73, (
+            'Проверьте, что подписка с работой на проверке опрашивается '
+            'раз в 300 секунд'
+        )
+        assert 18 <= calls['done'] <= 19, (
+            'Проверьте, что подписка с принятой работой опрашивается '
+            'раз в 1200 секунд'
+        )
@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+import exceptions
+from backoff import PollPolicy
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from clock import VirtualClock
+from delivery import DeliveryQueue
+from engine import PollingEngine
+from tenants import Tenant
+
+
+class TestCircuitBreaker:
+
+    def test_opens_and_probes_once(self):
+        clock = VirtualClock()
+        breaker = CircuitBreaker(failure_rate=0.5, window=4, min_calls=4,
+                                 reset_timeout=60, clock=clock.monotonic)
+        for _ in range(2):
+            breaker.record_success()
+        for _ in range(2):
+            breaker.record_failure()
+        assert breaker.state == OPEN, (
+            'Проверьте, что предохранитель открывается при доле сбоев 50%'
+        )
+        assert not breaker.allow(), (
+            'Проверьте, что открытый предохранитель запрещает запросы'
+        )
+
+        clock.now = 60
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow() and not breaker.allow(), (
+            'Проверьте, что в полуоткрытом состоянии идёт один пробный запрос'
+        )
+        breaker.record_failure()
+        assert breaker.state == OPEN
+
+        clock.now = 120
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CLOSED and breaker.allow(), (
+            'Проверьте, что успешная проба закрывает предохранитель'
+        )
+
+    def test_queued_polls_stop_when_breaker_opens(self):
+        calls = []
+
+        def fetch(token, timestamp):
+            calls.append(token)
+            time.sleep(0.01)
+            raise exceptions.APIResponseStatusCodeException(
+                'Ответ от эндпойнта отличается от 200: 500', 500
+            )
+
+        engine = PollingEngine(
+            [Tenant(f'token{number}', number) for number in range(10)],
+            fetch=fetch,
+            check_response=lambda response: response['homeworks'],
+            parse_status=lambda homework: homework.status,
+            delivery=DeliveryQueue(lambda chat_id, text: None),
+            policy=PollPolicy(0, backoff_base=60),
+            concurrency=1,
+            breaker=CircuitBreaker(failure_rate=1, window=2, min_calls=2,
+                                   reset_timeout=3600),
+        )
+
+        async def run():
+            task = asyncio.create_task(engine.run())
+            await asyncio.sleep(0.3)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(run())
+        assert len(calls) == 2, (
+            'Проверьте, что опросы, ждавшие очереди, не идут в API '
+            'после открытия предохранителя'
+        )
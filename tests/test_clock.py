@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+from backoff import PollPolicy
+from clock import VirtualClock
+from delivery import DeliveryQueue
+from engine import PollingEngine
+from tenants import Tenant
+
+
+class TestVirtualClock:
+
+    def test_sleep_advances_virtual_time(self):
+        clock = VirtualClock(start=1_000_000)
+
+        async def run():
+            await asyncio.sleep(3600)
+            return clock.time()
+
+        started = time.perf_counter()
+        assert clock.run(run()) == 1_000_000 + 3600, (
+            'Проверьте, что asyncio.sleep переводит виртуальные часы'
+        )
+        assert time.perf_counter() - started < 1
+
+    def test_time_stands_while_executor_runs(self):
+        clock = VirtualClock()
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, time.sleep, 0.05)
+            return clock.monotonic()
+
+        assert clock.run(run(), inline=False) == 0, (
+            'Проверьте, что время стоит, пока идёт вызов в пуле потоков'
+        )
+
+    def test_engine_polls_day_in_virtual_time(self):
+        clock = VirtualClock()
+        calls = []
+
+        def fetch(token, timestamp):
+            calls.append(token)
+            return {'homeworks': [], 'current_date': int(clock.time())}
+
+        engine = PollingEngine(
+            [Tenant(f'token-{number}', number) for number in range(3)],
+            fetch=fetch,
+            check_response=lambda response: response['homeworks'],
+            parse_status=str,
+            delivery=DeliveryQueue(lambda *args: None, clock=clock.monotonic),
+            policy=PollPolicy(600, jitter=0),
+            clock=clock,
+        )
+        started = time.perf_counter()
+        clock.run(engine.run(), duration=86400)
+        assert time.perf_counter() - started < 5
+        # Первый опрос — в пределах интервала, далее каждые 600 с.
+        assert all(
+            calls.count(f'token-{number}') in (144, 145)
+            for number in range(3)
+        ), 'Проверьте, что движок опрашивает подписки по часам clock'
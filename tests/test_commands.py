@@ -0,0 +1,105 @@
+from types import SimpleNamespace
+
+from cache import TTLCache
+from circuit_breaker import CircuitBreaker
+from clock import VirtualClock
+from commands import StatusCommands
+from models import Homework
+from tenants import Tenant
+
+
+def make_update(chat_id, replies):
+    return SimpleNamespace(
+        effective_chat=SimpleNamespace(id=chat_id),
+        effective_message=SimpleNamespace(reply_text=replies.append),
+    )
+
+
+class TestStatusCommands:
+
+    def test_answers_from_cache(self):
+        calls = []
+
+        def fetch(token, from_date):
+            calls.append(from_date)
+            return {'homeworks': [
+                {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'},
+                {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+            ], 'current_date': 1000198000}
+
+        clock = VirtualClock()
+        tenant = Tenant('token', 42)
+        commands = StatusCommands(
+            [tenant], fetch,
+            lambda response: map(Homework.from_dict, response['homeworks']),
+            {'approved': 'Принята', 'reviewing': 'На проверке'},
+            TTLCache(maxsize=10, ttl=60, clock=clock.monotonic),
+        )
+        replies = []
+        commands.status(make_update(42, replies), None)
+        commands.list(make_update(42, replies), None)
+        assert replies == [
+            '"hw2": На проверке',
+            '"hw2": На проверке\n"hw1": Принята',
+        ]
+        assert calls == [0], (
+            'Проверьте, что повторная команда отвечает из кеша'
+        )
+
+        commands.apply_changes(tenant, [Homework(2, 'hw2', 'approved')])
+        commands.status(make_update(42, replies), None)
+        assert replies[-1] == '"hw2": Принята', (
+            'Проверьте, что изменения из опроса попадают в кеш'
+        )
+
+        clock.now = 61
+        commands.status(make_update(42, replies), None)
+        assert calls == [0, 0], (
+            'Проверьте, что устаревший кеш обновляется из API'
+        )
+
+    def test_open_breaker_skips_api(self):
+        calls = []
+
+        def fetch(token, from_date):
+            calls.append(token)
+            return {'homeworks': [
+                {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+            ], 'current_date': 1000198000}
+
+        clock = VirtualClock()
+        breaker = CircuitBreaker(failure_rate=0.5, window=2, min_calls=2,
+                                 reset_timeout=600, clock=clock.monotonic)
+        cached, missing = Tenant('cached', 42), Tenant('missing', 43)
+        commands = StatusCommands(
+            [cached, missing], fetch,
+            lambda response: map(Homework.from_dict, response['homeworks']),
+            {'approved': 'Принята'},
+            TTLCache(maxsize=10, ttl=60, clock=clock.monotonic),
+            breaker=breaker,
+        )
+        replies = []
+        commands.status(make_update(42, replies), None)
+        breaker.record_failure()
+        breaker.record_failure()
+        clock.now = 61
+        commands.status(make_update(42, replies), None)
+        commands.status(make_update(43, replies), None)
+        assert calls == ['cached'], (
+            'Проверьте, что при открытом предохранителе команды '
+            'не обращаются к API'
+        )
+        assert replies == [
+            '"hw1": Принята',
+            '"hw1": Принята',
+            'API Практикума недоступно, попробуйте позже',
+        ], (
+            'Проверьте, что при открытом предохранителе ответ берётся '
+            'из кеша, даже устаревшего, а без кеша — короткое сообщение'
+        )
+
+    def test_unknown_chat(self):
+        commands = StatusCommands([], None, None, {}, TTLCache(10, 60))
+        replies = []
+        commands.status(make_update(1, replies), None)
+        assert replies == ['Этот чат не подписан на статусы домашних работ']
@@ -0,0 +1,125 @@
+import asyncio
+import time
+
+import metrics
+from clock import VirtualClock
+from delivery import DeliveryQueue, TokenBucket
+
+
+class RetryAfter(Exception):
+
+    def __init__(self, retry_after):
+        super().__init__(f'Retry in {retry_after}')
+        self.retry_after = retry_after
+
+
+class TestDelivery:
+
+    def test_token_bucket_reserves_in_order(self):
+        bucket = TokenBucket(rate=2, capacity=2, now=0)
+        delays = [bucket.reserve(0) for _ in range(4)]
+        assert delays == [0.0, 0.0, 0.5, 1.0], (
+            'Проверьте, что сверх запаса токены выдаются с задержкой 1/rate'
+        )
+        assert bucket.reserve(10) == 0.0, (
+            'Проверьте, что ведро наполняется со временем'
+        )
+
+    def test_queue_honors_retry_after(self):
+        attempts = []
+
+        def send(chat_id, text):
+            attempts.append(time.monotonic())
+            if len(attempts) == 1:
+                raise RetryAfter(0.2)
+
+        async def run():
+            queue = DeliveryQueue(send, workers=2, global_rate=100,
+                                  chat_rate=100)
+            await queue.start()
+            await queue.deliver(1, 'текст')
+            await queue.stop()
+            return queue.stats()
+
+        stats = asyncio.run(run())
+        assert stats['sent'] == 1 and stats['retried'] == 1, (
+            'Проверьте, что сообщение повторно отправляется после 429'
+        )
+        assert attempts[1] - attempts[0] >= 0.19, (
+            'Проверьте, что повторная отправка ждёт retry_after'
+        )
+
+    def test_busy_chat_does_not_delay_others(self):
+        clock = VirtualClock()
+        sent = []
+
+        def send(chat_id, text):
+            sent.append((chat_id, text, clock.monotonic()))
+
+        async def run():
+            queue = DeliveryQueue(send, workers=16, global_rate=30,
+                                  chat_rate=1, clock=clock.monotonic)
+            await queue.start()
+            backlog = [queue.deliver(1, number) for number in range(100)]
+            await queue.deliver(2, 'другой чат')
+            await asyncio.gather(*backlog)
+            await queue.stop()
+
+        clock.run(run())
+        other = [when for chat_id, _, when in sent if chat_id == 2]
+        assert other[0] < 1, (
+            'Проверьте, что очередь в один чат не задерживает другие чаты'
+        )
+        group = [(text, when) for chat_id, text, when in sent if chat_id == 1]
+        assert [text for text, _ in group] == list(range(100)), (
+            'Проверьте, что сообщения в один чат уходят по порядку'
+        )
+        assert all(
+            later - earlier >= 0.999
+            for (_, earlier), (_, later) in zip(group, group[1:])
+        ), 'Проверьте, что соблюдается лимит на чат'
+
+    def test_delivery_counters(self):
+        def send(chat_id, text):
+            if chat_id == 2:
+                raise ConnectionError('Чат недоступен')
+
+        async def run():
+            queue = DeliveryQueue(send, workers=2, global_rate=100,
+                                  chat_rate=100)
+            await queue.start()
+            await queue.deliver(1, 'текст')
+            await asyncio.gather(
+                queue.deliver(2, 'текст'), return_exceptions=True
+            )
+            await queue.stop()
+
+        sent = metrics.DELIVERY_SENT.value
+        failed = metrics.DELIVERY_FAILED.value
+        asyncio.run(run())
+        assert metrics.DELIVERY_SENT.value - sent == 1
+        assert metrics.DELIVERY_FAILED.value - failed == 1, (
+            'Проверьте, что неудачные отправки считаются в метриках'
+        )
+        text = metrics.REGISTRY.render()
+        assert '# TYPE homework_bot_delivery_sent_total counter' in text
+        assert '# TYPE homework_bot_delivery_failed_total counter' in text
+
+    def test_idle_chat_buckets_are_evicted(self):
+        clock = VirtualClock()
+
+        async def run():
+            queue = DeliveryQueue(lambda chat_id, text: None, global_rate=100,
+                                  clock=clock.monotonic)
+            await queue.start()
+            await asyncio.gather(*(
+                queue.deliver(chat_id, 'текст') for chat_id in range(50)
+            ))
+            await asyncio.sleep(120)
+            await queue.deliver('другой', 'текст')
+            await queue.stop()
+            return len(queue._chat_buckets)
+
+        assert clock.run(run()) == 1, (
+            'Проверьте, что вёдра простаивающих чатов удаляются'
+        )
@@ -0,0 +1,64 @@
+import socket
+
+import pytest
+import requests
+
+from clock import VirtualClock
+from error_notifier import RECOVERED_MESSAGE, ErrorNotifier, fingerprint
+
+
+class TestErrorNotifier:
+
+    def test_repeats_are_suppressed_until_recovery(self):
+        clock = VirtualClock()
+        notifier = ErrorNotifier(window=600, clock=clock.monotonic)
+
+        assert notifier.on_error('t', ConnectionError('Код 500')), (
+            'Проверьте, что первое уведомление об ошибке отправляется'
+        )
+        clock.now = 300
+        assert notifier.on_error('t', ConnectionError('Код 502')) is None, (
+            'Проверьте, что повтор той же ошибки в окне подавляется'
+        )
+        assert notifier.on_error('t', TypeError('не словарь')), (
+            'Проверьте, что новая ошибка отправляется сразу'
+        )
+        clock.now = 1000
+        assert notifier.on_error('t', TypeError('не словарь')), (
+            'Проверьте, что по истечении окна ошибка отправляется снова'
+        )
+        assert notifier.on_success('t') == RECOVERED_MESSAGE, (
+            'Проверьте, что после сбоя приходит сообщение о восстановлении'
+        )
+        assert notifier.on_success('t') is None, (
+            'Проверьте, что сообщение о восстановлении отправляется один раз'
+        )
+
+    def test_alternating_errors_are_suppressed(self):
+        clock = VirtualClock()
+        notifier = ErrorNotifier(window=600, clock=clock.monotonic)
+        sent = [
+            notifier.on_error('t', error)
+            for error in [ConnectionError('сеть'), TypeError('не словарь')] * 3
+        ]
+        assert sum(message is not None for message in sent) == 2, (
+            'Проверьте, что чередующиеся ошибки не повторяются в окне'
+        )
+
+    def test_connection_refused_is_one_error(self):
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        port = listener.getsockname()[1]
+        listener.close()
+        errors = []
+        for _ in range(5):
+            with pytest.raises(requests.ConnectionError) as error:
+                requests.get(f'http://127.0.0.1:{port}/', timeout=1)
+            errors.append(error.value)
+        assert len({fingerprint(error) for error in errors}) == 1, (
+            'Проверьте, что адреса объектов в тексте ошибки не делают '
+            'её новой'
+        )
+        notifier = ErrorNotifier(window=600, clock=VirtualClock().monotonic)
+        sent = [notifier.on_error('t', error) for error in errors]
+        assert sum(message is not None for message in sent) == 1
@@ -0,0 +1,61 @@
+import json
+
+from backoff import PollPolicy
+from clock import VirtualClock
+from delivery import DeliveryQueue
+from engine import PollingEngine
+from models import Homework
+from tenants import Tenant, load_tenants
+
+
+class TestFanOut:
+
+    def test_shared_token_is_merged(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'practicum_token': 'shared', 'chat_id': 1},
+            {'practicum_token': 'shared', 'chat_ids': [2, 1, 3]},
+            {'practicum_token': 'own', 'chat_id': 4},
+        ]))
+        tenants = load_tenants(path)
+        assert [tenant.chat_ids for tenant in tenants] == [(1, 2, 3), (4,)], (
+            'Проверьте, что подписки с одним токеном объединяются'
+        )
+        assert tenants[0].chat_id == 1
+
+    def test_status_reaches_every_chat_once(self):
+        clock = VirtualClock()
+        calls = []
+        sent = []
+        failures = {3: 1}
+
+        def fetch(token, timestamp):
+            calls.append(token)
+            return {
+                'homeworks': [Homework(1, 'hw', 'approved')],
+                'current_date': int(clock.time()),
+            }
+
+        def send(chat_id, message):
+            if failures.get(chat_id):
+                failures[chat_id] -= 1
+                raise ConnectionError('Чат недоступен')
+            sent.append(chat_id)
+
+        engine = PollingEngine(
+            [Tenant('shared', [1, 2, 3])],
+            fetch=fetch,
+            check_response=lambda response: response['homeworks'],
+            parse_status=lambda homework: homework.status,
+            delivery=DeliveryQueue(send, clock=clock.monotonic),
+            policy=PollPolicy(600, backoff_base=1, jitter=0),
+            clock=clock,
+        )
+        clock.run(engine.run(), duration=1800)
+        assert sorted(sent) == [1, 2, 3], (
+            'Проверьте, что статус доставлен во все чаты по одному разу, '
+            'а при повторе — только в недоставленные'
+        )
+        assert len(calls) <= 4, (
+            'Проверьте, что общий токен опрашивается один раз за интервал'
+        )
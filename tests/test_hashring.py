@@ -0,0 +1,30 @@
+from collections import Counter
+
+from hashring import HashRing
+from tenants import tenant_id
+
+
+KEYS = [tenant_id(f'token-{number}') for number in range(5000)]
+
+
+class TestHashRing:
+
+    def test_balance(self):
+        ring = HashRing(4)
+        counts = Counter(ring.shard_for(key) for key in KEYS)
+        assert set(counts) == {0, 1, 2, 3}
+        assert max(counts.values()) < 1.3 * len(KEYS) / 4, (
+            'Проверьте, что подписки распределяются по шардам равномерно'
+        )
+
+    def test_growth_moves_keys_only_to_new_shard(self):
+        before, after = HashRing(4), HashRing(5)
+        moved = [
+            key for key in KEYS
+            if before.shard_for(key) != after.shard_for(key)
+        ]
+        assert all(after.shard_for(key) == 4 for key in moved), (
+            'Проверьте, что при добавлении шарда подписки переезжают '
+            'только на новый шард'
+        )
+        assert len(moved) < 1.3 * len(KEYS) / 5
@@ -0,0 +1,94 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import exceptions
+import homework
+import http_client
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        status = self.server.status
+        body = json.dumps({'homeworks': [], 'current_date': 1}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    server.status = 200
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(
+        homework, 'ENDPOINT', f'http://127.0.0.1:{server.server_port}/'
+    )
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class RecordingSession:
+
+    def __init__(self, session):
+        self.session = session
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        self.calls.append(kwargs)
+        return self.session.get(url, **kwargs)
+
+
+class TestSession:
+
+    def test_shared_session_and_timeout_are_used(self, stub, monkeypatch):
+        def forbidden(*args, **kwargs):
+            raise AssertionError('Запрос мимо общей сессии')
+
+        monkeypatch.setattr('requests.get', forbidden)
+        session = RecordingSession(http_client.create_session(2))
+        for _ in range(3):
+            homework.request_api_answer('token', 0, session=session)
+        assert len(session.calls) == 3, (
+            'Проверьте, что запросы идут через переданную сессию'
+        )
+        assert all(
+            call['timeout'] == homework.HTTP_TIMEOUT
+            for call in session.calls
+        ), 'Проверьте, что у каждого запроса есть таймаут HTTP_TIMEOUT'
+
+    def test_exhausted_pool_does_not_block(self, stub):
+        session = http_client.create_session(1)
+        held = homework.send_api_request('token', 0, session, stream=True)
+        try:
+            # Единственное соединение пула занято непрочитанным ответом.
+            answer = homework.request_api_answer('token', 0, session=session)
+        finally:
+            held.close()
+        assert answer['homeworks'] == []
+
+    def test_error_responses_return_connections(self, stub):
+        stub.status = 401
+        session = http_client.create_session(2)
+        for _ in range(5):
+            with pytest.raises(exceptions.APIResponseStatusCodeException):
+                homework.request_api_stream('token', 0, session=session)
+        adapter = session.get_adapter(homework.ENDPOINT)
+        pool = adapter.poolmanager.connection_from_url(homework.ENDPOINT)
+        assert pool.num_connections <= 2, (
+            'Проверьте, что потоковый ответ с кодом не 200 закрывается '
+            'и соединение возвращается в пул'
+        )
@@ -0,0 +1,56 @@
+from journal import API, SEND, Journal, JournalWriter, replay
+
+
+def write_journal(path):
+    writer = JournalWriter(path)
+    writer.record_api('tenant', 1000198991, 200, b'{"homeworks": []}', 0.05)
+    writer.record_send(42, 'Новый статус', None, 0.01)
+    writer.record_api('tenant', 1000198991, 503, b'', 0.1)
+    writer.close()
+
+
+class TestJournal:
+
+    def test_records_round_trip(self, tmp_path):
+        path = str(tmp_path / 'journal.bin')
+        write_journal(path)
+        with Journal(path) as journal:
+            records = [
+                (record.kind, record.meta, bytes(record.body))
+                for record in journal
+            ]
+        assert records == [
+            (API, {'tenant': 'tenant', 'from_date': 1000198991,
+                   'status': 200}, b'{"homeworks": []}'),
+            (SEND, {'chat_id': 42, 'error': None},
+             'Новый статус'.encode()),
+            (API, {'tenant': 'tenant', 'from_date': 1000198991,
+                   'status': 503}, b''),
+        ], 'Проверьте, что записи журнала читаются без искажений'
+
+    def test_truncated_tail_is_skipped(self, tmp_path):
+        path = tmp_path / 'journal.bin'
+        write_journal(str(path))
+        data = path.read_bytes()
+        path.write_bytes(data[:-3])
+        with Journal(str(path)) as journal:
+            assert len(list(journal)) == 2, (
+                'Проверьте, что оборванная последняя запись пропускается'
+            )
+
+    def test_replay_scales_time(self, tmp_path):
+        path = str(tmp_path / 'journal.bin')
+        writer = JournalWriter(path)
+        for second in range(4):
+            writer.record(API, {'status': 200}, timestamp=100.0 + second)
+        writer.close()
+        sleeps = []
+        with Journal(path) as journal:
+            count = replay(
+                journal, lambda record: None, speed=2,
+                sleep=sleeps.append, clock=lambda: 0.0,
+            )
+        assert count == 4
+        assert sleeps == [0.5, 1.0, 1.5], (
+            'Проверьте, что интервалы между записями делятся на speed'
+        )
@@ -0,0 +1,131 @@
+import asyncio
+
+from clock import VirtualClock
+from leases import LeaseKeeper, LeaseManager
+from storage import Storage
+
+
+TENANTS = {f'tenant-{number}' for number in range(100)}
+
+
+def create_replicas(tmp_path, clock, count):
+    path = str(tmp_path / 'bot.sqlite3')
+    return [
+        LeaseManager(Storage(path), f'replica-{number}', ttl=60,
+                     clock=clock.time)
+        for number in range(count)
+    ]
+
+
+class TestLeaseManager:
+
+    def test_new_replica_takes_half_without_overlap(self, tmp_path):
+        clock = VirtualClock(start=1000.0)
+        first, second = create_replicas(tmp_path, clock, 2)
+        claimed, _ = first.sync(TENANTS, {})
+        assert set(claimed) == TENANTS
+
+        second.sync(TENANTS, {})
+        assert not second.owned, (
+            'Проверьте, что занятые подписки не захватываются повторно'
+        )
+        _, released = first.sync(TENANTS, {key: 2000.0 for key in TENANTS})
+        assert len(released) == 50
+        claimed, _ = second.sync(TENANTS, {})
+        assert claimed == {key: 2000.0 for key in released}, (
+            'Проверьте, что новый владелец получает срок следующего опроса'
+        )
+        assert not first.owned & second.owned, (
+            'Проверьте, что подписку опрашивает только одна реплика'
+        )
+        assert first.owned | second.owned == TENANTS
+
+    def test_dead_replica_is_taken_over_after_ttl(self, tmp_path):
+        clock = VirtualClock(start=1000.0)
+        first, second = create_replicas(tmp_path, clock, 2)
+        first.sync(TENANTS, {})
+        second.sync(TENANTS, {})
+        first.sync(TENANTS, {})
+        second.sync(TENANTS, {})
+
+        clock.now += 30
+        second.sync(TENANTS, {})
+        assert len(second.owned) == 50, (
+            'Проверьте, что действующая аренда не перехватывается'
+        )
+        clock.now += 31
+        second.sync(TENANTS, {})
+        assert second.owned == TENANTS, (
+            'Проверьте, что подписки упавшей реплики достаются живой'
+        )
+
+    def test_release_on_shutdown(self, tmp_path):
+        clock = VirtualClock(start=1000.0)
+        first, second = create_replicas(tmp_path, clock, 2)
+        first.sync(TENANTS, {})
+        first.release({})
+        second.sync(TENANTS, {})
+        assert second.owned == TENANTS
+
+    def test_only_one_replica_leads(self, tmp_path):
+        clock = VirtualClock(start=1000.0)
+        first, second = create_replicas(tmp_path, clock, 2)
+        assert first.hold('leader') and not second.hold('leader'), (
+            'Проверьте, что ведущей может быть только одна реплика'
+        )
+        clock.now += 30
+        assert first.hold('leader') and not second.hold('leader')
+        clock.now += 61
+        assert second.hold('leader') and not first.hold('leader'), (
+            'Проверьте, что ведущей становится живая реплика'
+        )
+        second.release({})
+        assert first.hold('leader'), (
+            'Проверьте, что при остановке реплика отдаёт аренду ведущей'
+        )
+
+
+class FakeEngine:
+
+    def __init__(self):
+        self.tenants = {}
+
+    def due_times(self):
+        return {}
+
+    def add_tenant(self, tenant, due=None):
+        self.tenants[tenant.id] = tenant
+
+    def remove_tenant(self, key):
+        self.tenants.pop(key, None)
+
+
+class TestLeaseKeeper:
+
+    def test_leader_starts_and_stops_commands(self, tmp_path):
+        calls = []
+        first, second = create_replicas(tmp_path, VirtualClock(start=1000.0), 2)
+        keepers = [
+            LeaseKeeper(FakeEngine(), manager, [],
+                        on_leader=lambda leading, number=number:
+                        calls.append((number, leading)))
+            for number, manager in enumerate((first, second))
+        ]
+
+        async def run():
+            tasks = []
+            for keeper in keepers:
+                tasks.append(asyncio.create_task(keeper.run()))
+                await asyncio.sleep(0.1)
+            tasks[0].cancel()
+            await asyncio.gather(tasks[0], return_exceptions=True)
+            keepers[1].set_candidates([])
+            await asyncio.sleep(0.1)
+            tasks[1].cancel()
+            await asyncio.gather(tasks[1], return_exceptions=True)
+
+        asyncio.run(run())
+        assert calls == [(0, True), (0, False), (1, True), (1, False)], (
+            'Проверьте, что команды принимает одна реплика, а при её '
+            'остановке — следующая'
+        )
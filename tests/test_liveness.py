@@ -0,0 +1,124 @@
+import asyncio
+import json
+import logging
+import time
+import urllib.error
+import urllib.request
+
+import metrics
+from backoff import PollPolicy
+from clock import VirtualClock
+from delivery import DeliveryQueue
+from engine import PollingEngine
+from liveness import Watchdog
+from tenants import Tenant
+
+
+class TestWatchdog:
+
+    def test_hung_poll_dumps_stacks_once(self, caplog, tmp_path):
+        clock = VirtualClock()
+        path = tmp_path / 'heartbeat.json'
+        watchdog = Watchdog(
+            interval=1, stall_threshold=60, heartbeat_timeout=600,
+            heartbeat_path=str(path), clock=clock.monotonic,
+        )
+        watchdog.loop_tick = 0
+        watchdog.poll_started('tenant')
+        clock.now = watchdog.loop_tick = 30
+        assert watchdog.check()['alive']
+        assert json.loads(path.read_text())['alive'], (
+            'Проверьте, что живой процесс обновляет файл heartbeat'
+        )
+
+        clock.now = watchdog.loop_tick = 61
+        with caplog.at_level(logging.CRITICAL, logger='liveness'):
+            assert not watchdog.check()['alive']
+            watchdog.check()
+        dumps = [
+            record for record in caplog.records if 'Поток' in record.message
+        ]
+        assert len(dumps) == 1, (
+            'Проверьте, что при зависании стеки потоков пишутся в лог один раз'
+        )
+
+        watchdog.beat('tenant')
+        status = watchdog.check()
+        assert status['alive'] and status['ready']
+        clock.now = watchdog.loop_tick = 700
+        assert not watchdog.check()['ready'], (
+            'Проверьте, что без опросов дольше heartbeat_timeout процесс '
+            'не готов'
+        )
+
+    def test_queued_polls_are_not_stalls(self):
+        watchdog = Watchdog(stall_threshold=60)
+        ages = []
+
+        def fetch(token, timestamp):
+            time.sleep(0.05)
+            ages.append(watchdog.status()['oldest_poll_age'])
+            return {'homeworks': [], 'current_date': 1}
+
+        engine = PollingEngine(
+            [Tenant(f'token{number}', number) for number in range(5)],
+            fetch=fetch,
+            check_response=lambda response: response['homeworks'],
+            parse_status=lambda homework: homework.status,
+            delivery=DeliveryQueue(lambda chat_id, text: None),
+            policy=PollPolicy(0),
+            concurrency=1,
+            watchdog=watchdog,
+        )
+
+        async def run():
+            task = asyncio.create_task(engine.run())
+            while len(ages) < 5:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(run())
+        assert max(ages) < 0.15, (
+            'Проверьте, что отсчёт зависания начинается с запроса, '
+            'а не с ожидания семафора'
+        )
+        assert 'scheduler_lag' in watchdog.status()
+        assert 'homework_bot_scheduler_lag_seconds_count 0\n' not in (
+            metrics.REGISTRY.render()
+        ), 'Проверьте, что опоздание запуска опросов отдаётся отдельно'
+
+    def test_monitor_measures_loop_lag(self):
+        watchdog = Watchdog(interval=0.05)
+
+        async def run():
+            task = asyncio.create_task(watchdog.monitor())
+            await asyncio.sleep(0.01)
+            # Блокирующий вызов в цикле событий.
+            time.sleep(0.2)
+            await asyncio.sleep(0.01)
+            task.cancel()
+
+        asyncio.run(run())
+        assert watchdog.loop_lag >= 0.1, (
+            'Проверьте, что замеряется задержка цикла событий'
+        )
+
+    def test_health_endpoints(self):
+        status = {'alive': True, 'ready': False}
+        server = metrics.start_http_server(0, health=lambda: status)
+        port = server.server_address[1]
+        codes = {}
+        try:
+            for path in ('/healthz', '/readyz'):
+                try:
+                    with urllib.request.urlopen(
+                        f'http://127.0.0.1:{port}{path}'
+                    ) as response:
+                        codes[path] = response.status
+                except urllib.error.HTTPError as error:
+                    codes[path] = error.code
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert codes == {'/healthz': 200, '/readyz': 503}
@@ -0,0 +1,66 @@
+import json
+import logging
+import queue
+import sys
+
+import metrics
+from log_config import (ContextFilter, JsonFormatter, NonBlockingQueueHandler,
+                        log_context)
+
+
+def make_record(message='Сообщение', level=logging.INFO, exc_info=None):
+    return logging.LogRecord(
+        'homework', level, __file__, 10, message, (), exc_info
+    )
+
+
+class TestLogConfig:
+
+    def test_json_line_has_context_fields(self):
+        token = log_context.set({'tenant': 'abc', 'request': 7})
+        try:
+            record = make_record()
+            ContextFilter().filter(record)
+        finally:
+            log_context.reset(token)
+        data = json.loads(JsonFormatter().format(record))
+        assert data['message'] == 'Сообщение'
+        assert data['level'] == 'INFO' and data['logger'] == 'homework'
+        assert (data['tenant'], data['request']) == ('abc', 7), (
+            'Проверьте, что поля tenant и request берутся из log_context'
+        )
+
+    def test_json_without_context_and_with_exception(self):
+        try:
+            raise ValueError('сбой')
+        except ValueError:
+            record = make_record(level=logging.ERROR, exc_info=sys.exc_info())
+        ContextFilter().filter(record)
+        data = json.loads(JsonFormatter().format(record))
+        assert 'tenant' not in data and 'request' not in data
+        assert 'ValueError: сбой' in data['exc_info']
+
+    def test_full_queue_drops_records(self):
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=2))
+        before = metrics.LOG_DROPPED.value
+        for _ in range(5):
+            handler.handle(make_record())
+        assert handler.queue.qsize() == 2
+        assert handler.dropped == 3, (
+            'Проверьте, что при переполнении очереди записи отбрасываются'
+        )
+        assert metrics.LOG_DROPPED.value - before == 3, (
+            'Проверьте, что отброшенные записи видны в метриках'
+        )
+
+    def test_level_is_not_pinned_in_homework(self):
+        import homework
+        root = logging.getLogger()
+        level = root.level
+        root.setLevel(logging.INFO)
+        try:
+            assert not homework.logger.isEnabledFor(logging.DEBUG), (
+                'Проверьте, что уровень логгера homework задаёт LOG_LEVEL'
+            )
+        finally:
+            root.setLevel(level)
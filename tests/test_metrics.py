@@ -0,0 +1,44 @@
+import urllib.request
+
+import metrics
+
+
+class TestMetrics:
+
+    def test_render_prometheus_text(self):
+        registry = metrics.Registry()
+        errors = registry.counter('errors_total', 'Ошибки.', ('stage',))
+        latency = registry.histogram('latency_seconds', 'Задержка.')
+        depth = registry.gauge('depth', 'Глубина.')
+        errors.labels('fetch').inc()
+        latency.observe(0.2)
+        depth.set_function(lambda: 7)
+
+        text = registry.render()
+        for line in [
+            '# TYPE errors_total counter',
+            'errors_total{stage="fetch"} 1',
+            'latency_seconds_bucket{le="0.1"} 0',
+            'latency_seconds_bucket{le="0.25"} 1',
+            'latency_seconds_bucket{le="+Inf"} 1',
+            'latency_seconds_count 1',
+            'depth 7',
+        ]:
+            assert line in text.splitlines(), (
+                f'Проверьте формат вывода метрик: нет строки `{line}`'
+            )
+
+    def test_http_endpoint(self):
+        server = metrics.start_http_server(0)
+        try:
+            with metrics.track('check_response'):
+                pass
+            port = server.server_address[1]
+            with urllib.request.urlopen(
+                f'http://127.0.0.1:{port}/metrics'
+            ) as response:
+                body = response.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert 'stage="check_response"' in body
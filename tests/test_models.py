@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+import exceptions
+from models import Homework
+
+
+class TestHomework:
+
+    def test_from_dict_interns_status(self):
+        first = Homework.from_dict(json.loads(
+            '{"id": 1, "homework_name": "hw1", "status": "approved"}'
+        ))
+        second = Homework.from_dict(json.loads(
+            '{"id": 2, "homework_name": "hw2", "status": "approved"}'
+        ))
+        assert first.status is second.status, (
+            'Проверьте, что статус записи интернирован'
+        )
+        assert first.key == '1' and not hasattr(first, '__dict__')
+
+    def test_from_dict_requires_name(self):
+        with pytest.raises(KeyError):
+            Homework.from_dict({'status': 'approved'})
+
+    @pytest.mark.parametrize('status', [None, 1, ['approved']])
+    def test_from_dict_rejects_non_string_status(self, status):
+        with pytest.raises(exceptions.UnknownHWStatusException):
+            Homework.from_dict({'homework_name': 'hw1', 'status': status})
+
+    def test_parse_status_accepts_record(self):
+        import homework
+
+        message = homework.parse_status(Homework(1, 'hw1', 'approved'))
+        assert message.startswith('Изменился статус проверки работы "hw1"')
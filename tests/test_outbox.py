@@ -0,0 +1,238 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import telegram
+
+import homework
+from backoff import PollPolicy
+from clock import VirtualClock
+from delivery import DeliveryQueue
+from engine import PollingEngine
+from models import Homework
+from outbox import Outbox
+from storage import Storage
+from tenants import Tenant
+
+
+def make_engine(storage, clock, send, statuses):
+    tenant = Tenant('token', [1, 2])
+
+    def fetch(token, timestamp):
+        return {
+            'homeworks': [Homework(1, 'hw', statuses[0])],
+            'current_date': int(clock.time()),
+        }
+
+    delivery = DeliveryQueue(send, clock=clock.monotonic)
+    return PollingEngine(
+        [tenant],
+        fetch=fetch,
+        check_response=lambda response: response['homeworks'],
+        parse_status=lambda homework: homework.status,
+        delivery=delivery,
+        policy=PollPolicy(600, jitter=0),
+        storage=storage,
+        clock=clock,
+        outbox=Outbox(storage, delivery, clock, retry_base=60),
+    )
+
+
+class TestOutbox:
+
+    def test_retries_until_delivered(self, tmp_path):
+        storage = Storage(str(tmp_path / 'bot.sqlite3'))
+        clock = VirtualClock(start=1_000_000)
+        sent = []
+        failures = {2: 3}
+
+        def send(chat_id, message):
+            if failures.get(chat_id):
+                failures[chat_id] -= 1
+                raise ConnectionError('Чат недоступен')
+            sent.append((chat_id, message))
+
+        engine = make_engine(storage, clock, send, ['approved'])
+        clock.run(engine.run(), duration=3600)
+        assert sorted(sent) == [(1, 'approved'), (2, 'approved')], (
+            'Проверьте, что уведомление доставляется после повторов '
+            'и только один раз в каждый чат'
+        )
+        storage.close()
+
+    def test_pending_survive_restart(self, tmp_path):
+        path = str(tmp_path / 'bot.sqlite3')
+        clock = VirtualClock(start=1_000_000)
+        storage = Storage(path)
+        outbox = Outbox(storage, None, clock)
+        clock.run(outbox.enqueue(
+            Tenant('token', [1, 2]), [Homework(1, 'hw', 'approved')],
+            ['approved'],
+        ))
+        storage.close()
+
+        sent = []
+        storage = Storage(path)
+        engine = make_engine(
+            storage, clock, lambda *args: sent.append(args), ['approved']
+        )
+        clock.run(engine.run(), duration=1200)
+        assert sorted(sent) == [(1, 'approved'), (2, 'approved')], (
+            'Проверьте, что уведомления из очереди уходят после '
+            'перезапуска, а известный статус не ставится повторно'
+        )
+        storage.close()
+
+    def test_interrupted_send_is_not_repeated(self, tmp_path):
+        path = str(tmp_path / 'bot.sqlite3')
+        clock = VirtualClock(start=1_000_000)
+        storage = Storage(path)
+        clock.run(Outbox(storage, None, clock).enqueue(
+            Tenant('token', [1]), [Homework(1, 'hw', 'approved')],
+            ['approved'],
+        ))
+        # Отправка началась, и процесс упал, не отметив результат.
+        [row] = storage.claim_notifications(clock.time(), 10, 0)
+        storage.start_notification(row[0])
+        storage.close()
+
+        sent = []
+        storage = Storage(path)
+        engine = make_engine(
+            storage, clock, lambda *args: sent.append(args), ['approved']
+        )
+        clock.run(engine.run(), duration=1200)
+        assert sent == [], (
+            'Проверьте, что прерванная отправка не повторяется'
+        )
+        storage.close()
+
+    def test_claimed_but_not_started_is_sent_after_crash(self, tmp_path):
+        path = str(tmp_path / 'bot.sqlite3')
+        clock = VirtualClock(start=1_000_000)
+        storage = Storage(path)
+        clock.run(Outbox(storage, None, clock).enqueue(
+            Tenant('token', [1]), [Homework(1, 'hw', 'approved')],
+            ['approved'],
+        ))
+        # Уведомление ждало в очереди доставки, когда процесс упал.
+        assert len(storage.claim_notifications(clock.time(), 10, 0)) == 1
+        storage.close()
+
+        sent = []
+        storage = Storage(path)
+        engine = make_engine(
+            storage, clock, lambda *args: sent.append(args), ['approved']
+        )
+        clock.run(engine.run(), duration=1200)
+        assert sent == [(1, 'approved')], (
+            'Проверьте, что не начатая отправка не теряется при падении'
+        )
+        storage.close()
+
+    def test_slow_backlog_is_not_sent_twice(self, tmp_path):
+        storage = Storage(str(tmp_path / 'bot.sqlite3'))
+        clock = VirtualClock(start=1_000_000)
+        sent = []
+
+        async def run():
+            delivery = DeliveryQueue(
+                lambda *args: sent.append(args), chat_rate=1 / 100,
+                clock=clock.monotonic,
+            )
+            outbox = Outbox(storage, delivery, clock, claim_ttl=60)
+            await outbox.enqueue(
+                Tenant('token', [1]),
+                [Homework(number, 'hw', 'approved') for number in range(3)],
+                ['approved'] * 3,
+            )
+            await delivery.start()
+            task = asyncio.create_task(outbox.run())
+            await asyncio.sleep(1000)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await delivery.stop()
+
+        clock.run(run())
+        assert len(sent) == 3, (
+            'Проверьте, что уведомления, долго ждущие в очереди доставки, '
+            'не забираются повторно'
+        )
+        storage.close()
+
+    def test_unavailable_chat_is_not_retried(self, tmp_path):
+        storage = Storage(str(tmp_path / 'bot.sqlite3'))
+        clock = VirtualClock(start=1_000_000)
+        attempts = []
+
+        def send_message(chat_id, text):
+            attempts.append(chat_id)
+            if chat_id == 2:
+                raise telegram.error.Unauthorized(
+                    'Forbidden: bot was blocked by the user'
+                )
+
+        bot = SimpleNamespace(send_message=send_message)
+        engine = make_engine(
+            storage, clock,
+            lambda chat_id, text: homework.send_chat_message(
+                bot, chat_id, text
+            ),
+            ['approved'],
+        )
+        clock.run(engine.run(), duration=3600)
+        assert sorted(attempts) == [1, 2], (
+            'Проверьте, что уведомление в заблокировавший бота чат '
+            'не повторяется'
+        )
+        assert storage.next_notification_due() is None, (
+            'Проверьте, что уведомление в недоступный чат помечается failed'
+        )
+        storage.close()
+
+    def test_storage_is_called_off_the_loop(self, tmp_path):
+        storage = Storage(str(tmp_path / 'bot.sqlite3'))
+        clock = VirtualClock(start=1_000_000)
+        threads = {}
+
+        class RecordingStorage:
+
+            def __getattr__(self, name):
+                method = getattr(storage, name)
+
+                def call(*args):
+                    threads.setdefault(name, set()).add(
+                        threading.current_thread()
+                    )
+                    return method(*args)
+
+                return call
+
+        sent = []
+
+        async def run():
+            delivery = DeliveryQueue(
+                lambda *args: sent.append(args), clock=clock.monotonic
+            )
+            outbox = Outbox(RecordingStorage(), delivery, clock)
+            await delivery.start()
+            task = asyncio.create_task(outbox.run())
+            await outbox.enqueue(
+                Tenant('token', [1]), [Homework(1, 'hw', 'approved')],
+                ['approved'],
+            )
+            while 'complete_notification' not in threads:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await delivery.stop()
+
+        asyncio.run(run())
+        storage.close()
+        assert sent == [(1, 'approved')]
+        for name in ('enqueue_notifications', 'start_notification',
+                     'complete_notification'):
+            assert threading.main_thread() not in threads[name], (
+                f'Проверьте, что {name} выполняется в пуле потоков, '
+                'а не в цикле событий'
+            )
@@ -0,0 +1,51 @@
+import pstats
+import threading
+import time
+import tracemalloc
+
+from profiling import Profiler
+
+
+def busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+class TestProfiler:
+
+    def test_cpu_profile_files(self, tmp_path):
+        profiler = Profiler(str(tmp_path), sample_interval=0.005)
+        assert profiler.toggle_cpu() is None
+        worker = threading.Thread(target=busy, args=(0.2,), name='poll_0')
+        worker.start()
+        busy(0.1)
+        worker.join()
+        pstats_path, collapsed_path = profiler.toggle_cpu()
+
+        stats = pstats.Stats(pstats_path)
+        assert any(func[2] == 'busy' for func in stats.stats), (
+            'Проверьте, что cProfile пишет профиль в формате pstats'
+        )
+        with open(collapsed_path, encoding='utf-8') as file:
+            lines = file.read().splitlines()
+        assert any(
+            line.startswith('poll;') and 'busy (' in line for line in lines
+        ), 'Проверьте, что выборка стеков видит потоки пула'
+        assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines), (
+            'Проверьте формат свёрнутых стеков: «стек число»'
+        )
+
+    def test_memory_snapshot(self, tmp_path):
+        profiler = Profiler(str(tmp_path))
+        assert profiler.toggle_memory() is None
+        data = [bytearray(1024) for _ in range(100)]
+        path = profiler.toggle_memory()
+        assert not tracemalloc.is_tracing(), (
+            'Проверьте, что повторный сигнал выключает tracemalloc'
+        )
+        snapshot = tracemalloc.Snapshot.load(path)
+        assert snapshot.statistics('filename'), (
+            'Проверьте, что снимок памяти сохраняется в файл'
+        )
+        del data
@@ -0,0 +1,28 @@
+from scheduler import DeadlineScheduler
+
+
+class TestDeadlineScheduler:
+
+    def test_pops_in_deadline_order(self):
+        scheduler = DeadlineScheduler()
+        scheduler.schedule('a', 30)
+        scheduler.schedule('b', 10)
+        scheduler.schedule('c', 20)
+        scheduler.schedule('a', 5)
+
+        assert scheduler.next_due() == 5, (
+            'Проверьте, что перенос срока учитывается в очереди'
+        )
+        assert scheduler.pop_due(20) == ['a', 'b', 'c']
+        assert scheduler.next_due() is None and len(scheduler) == 0, (
+            'Проверьте, что устаревшие записи не остаются в очереди'
+        )
+
+    def test_remove(self):
+        scheduler = DeadlineScheduler()
+        for key in range(1000):
+            scheduler.schedule(key, key)
+            scheduler.schedule(key, key + 1)
+        scheduler.remove(0)
+        assert len(scheduler) == 999 and 0 not in scheduler
+        assert scheduler.pop_due(2) == [1]
@@ -0,0 +1,39 @@
+from models import Homework
+from status_index import StatusIndex
+from storage import Storage
+
+
+class TestStorage:
+
+    def test_cursor_survives_restart(self, tmp_path):
+        path = str(tmp_path / 'bot.sqlite3')
+        storage = Storage(path)
+        storage.save_cursor('tenant', 1000198000)
+        storage.save_cursor('tenant', 1000198991)
+        storage.close()
+
+        storage = Storage(path)
+        assert storage.load_cursors() == {'tenant': 1000198991}, (
+            'Проверьте, что курсор подписки сохраняется между перезапусками'
+        )
+        storage.close()
+
+    def test_status_index_reports_only_transitions(self, tmp_path):
+        storage = Storage(str(tmp_path / 'bot.sqlite3'))
+        index = StatusIndex(storage)
+        homeworks = [
+            Homework(1, 'hw1', 'reviewing'),
+            Homework(2, 'hw2', 'approved'),
+        ]
+        assert index.diff('tenant', homeworks) == homeworks, (
+            'Проверьте, что новые работы считаются изменившимися'
+        )
+        for homework in homeworks:
+            index.update('tenant', homework)
+
+        homeworks[0] = Homework(1, 'hw1', 'rejected')
+        index = StatusIndex(storage)
+        assert index.diff('tenant', homeworks) == [homeworks[0]], (
+            'Проверьте, что уведомление уходит только при смене статуса'
+        )
+        storage.close()
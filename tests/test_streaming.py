@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+import exceptions
+from streaming import HomeworkStream
+
+
+def chunks(data, size):
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+class TestHomeworkStream:
+
+    @pytest.mark.parametrize('size', [1, 3, 64, 1 << 16])
+    def test_yields_homeworks_across_chunk_borders(self, size):
+        data = {
+            'current_date': 1000198991,
+            'homeworks': [
+                {'id': number, 'homework_name': f'работа {number}',
+                 'status': 'approved'}
+                for number in range(20)
+            ],
+        }
+        stream = HomeworkStream(
+            chunks(json.dumps(data, ensure_ascii=False).encode(), size)
+        )
+        assert list(stream) == data['homeworks'], (
+            'Проверьте, что поток отдаёт все работы из ответа'
+        )
+        assert stream.current_date == data['current_date'], (
+            'Проверьте, что число на границе частей читается целиком'
+        )
+
+    @pytest.mark.parametrize('body, error', [
+        (b'[]', TypeError),
+        (b'{"homeworks": {}, "current_date": 1}', ValueError),
+        (b'{"homeworks": []}', exceptions.CheckResponseException),
+        (b'{"current_date": 1}', exceptions.CheckResponseException),
+        (b'{"homeworks": [{"id": 1}', exceptions.CheckResponseException),
+    ])
+    def test_malformed_response(self, body, error):
+        with pytest.raises(error):
+            list(HomeworkStream(chunks(body, 4)))
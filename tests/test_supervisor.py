@@ -0,0 +1,101 @@
+import multiprocessing
+import threading
+import time
+
+from supervisor import Supervisor, rebalance
+from tenants import Tenant
+
+
+def crashing_worker(shard, shards, control):
+    raise SystemExit(1)
+
+
+def echo_worker(shard, shards, control):
+    control.send((shard, shards))
+    while True:
+        control.send((shard, control.recv()))
+
+
+class FakeEngine:
+
+    def __init__(self):
+        self.tenants = {}
+
+    def add_tenant(self, tenant):
+        self.tenants[tenant.id] = tenant
+
+    def remove_tenant(self, key):
+        del self.tenants[key]
+
+
+def run_in_thread(supervisor):
+    thread = threading.Thread(target=supervisor.run)
+    thread.start()
+    return thread
+
+
+def wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'Условие не выполнилось вовремя'
+        time.sleep(0.01)
+
+
+class TestSupervisor:
+
+    def test_restarts_crashed_worker_with_backoff(self):
+        supervisor = Supervisor(
+            crashing_worker, 2, restart_base=0.05, restart_max=0.2,
+            context=multiprocessing.get_context('fork'),
+        )
+        thread = run_in_thread(supervisor)
+        try:
+            wait_until(lambda: all(
+                worker.failures >= 3
+                for worker in supervisor._workers.values()
+            ))
+        finally:
+            supervisor.stop()
+            thread.join(10)
+        assert not thread.is_alive()
+
+    def test_resize_notifies_workers(self):
+        supervisor = Supervisor(
+            echo_worker, 2, context=multiprocessing.get_context('fork'),
+        )
+        thread = run_in_thread(supervisor)
+        try:
+            wait_until(lambda: len(supervisor.alive()) == 2)
+            controls = {
+                shard: worker.control
+                for shard, worker in supervisor._workers.items()
+            }
+            for shard, control in controls.items():
+                assert control.recv() == (shard, 2)
+            supervisor.resize(3)
+            wait_until(lambda: len(supervisor.alive()) == 3)
+            for shard, control in controls.items():
+                assert control.recv() == (shard, 3), (
+                    'Проверьте, что работающие шарды узнают новое число шардов'
+                )
+            assert supervisor._workers[2].control.recv() == (2, 3)
+        finally:
+            supervisor.stop()
+            thread.join(10)
+        assert not thread.is_alive()
+
+    def test_rebalance_moves_only_affected_tenants(self):
+        tenants = [Tenant(f'token-{number}', number) for number in range(300)]
+        engines = [FakeEngine() for _ in range(3)]
+        for shard, engine in enumerate(engines):
+            rebalance(engine, tenants, shard, 3)
+        assert sum(len(engine.tenants) for engine in engines) == 300
+
+        moved = sum(
+            sum(rebalance(engine, tenants, shard, 4))
+            for shard, engine in enumerate(engines)
+        )
+        assert moved < 300 / 4 * 1.5, (
+            'Проверьте, что при смене числа шардов переезжает только '
+            'часть подписок'
+        )